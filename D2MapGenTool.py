@@ -4,8 +4,11 @@
 基于配置文件的智能启动脚本
 """
 
+import contextlib
+import io
 import os
 import sys
+import multiprocessing as mp
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 from app_config import AppConfig
@@ -15,10 +18,12 @@ def setup_matplotlib_backend(config: AppConfig):
     """根据配置设置matplotlib后端"""
     import matplotlib
 
+    verbose = config.is_verbose_output()
+
     # 检查是否启用GUI
     if not config.is_gui_enabled():
         matplotlib.use("Agg")
-        if config.is_verbose_output():
+        if verbose:
             print("🔧 配置禁用GUI，使用Agg后端")
         return False
 
@@ -27,7 +32,7 @@ def setup_matplotlib_backend(config: AppConfig):
         "microsoft" in os.uname().release.lower() if hasattr(os, "uname") else False
     )
 
-    if is_wsl and config.is_verbose_output():
+    if is_wsl and verbose:
         print("🔍 检测到WSL环境，配置matplotlib后端...")
 
     # 检查DISPLAY环境变量
@@ -36,7 +41,7 @@ def setup_matplotlib_backend(config: AppConfig):
     if not has_display and config.should_auto_set_display():
         display_value = config.get_default_display()
         os.environ["DISPLAY"] = display_value
-        if config.is_verbose_output():
+        if verbose:
             print(f"🔧 自动设置 DISPLAY={display_value}")
         has_display = True
 
@@ -44,18 +49,18 @@ def setup_matplotlib_backend(config: AppConfig):
     if has_display:
         try:
             matplotlib.use("TkAgg")
-            if config.is_verbose_output():
+            if verbose:
                 print(f"✅ 已设置matplotlib后端: {matplotlib.get_backend()}")
             return True
         except Exception as e:
-            if config.is_verbose_output():
+            if verbose:
                 print(f"❌ 无法设置TkAgg后端: {e}")
                 print("🔧 切换到Agg后端 (无GUI模式)")
             matplotlib.use("Agg")
             return False
     else:
         matplotlib.use("Agg")
-        if config.is_verbose_output():
+        if verbose:
             print("🔧 无DISPLAY环境变量，使用Agg后端 (无GUI模式)")
         return False
 
@@ -104,7 +109,9 @@ def run_gui_mode(config: AppConfig):
     tile_width, tile_height = config.get_default_map_size()
     phase = config.get_phase()
 
-    if config.is_verbose_output():
+    verbose = config.is_verbose_output()
+
+    if verbose:
         print("启动GUI界面...")
         if phase is not None:
             print(f"使用地形阶段: {phase}")
@@ -116,7 +123,7 @@ def run_gui_mode(config: AppConfig):
         visualizer = MapVisualizer(width=width, height=height, phase=phase)
         visualizer.show()
     except Exception as e:
-        if config.is_verbose_output():
+        if verbose:
             print(f"❌ GUI启动失败: {e}")
             print("可能的原因:")
             print("- X11服务器未运行")
@@ -124,20 +131,70 @@ def run_gui_mode(config: AppConfig):
             print("- 缺少必要的GUI库")
 
         if config.should_fallback_to_headless():
-            if config.is_verbose_output():
+            if verbose:
                 print("🔄 自动切换到无GUI模式...")
             run_headless_mode(config)
         else:
-            if config.is_verbose_output():
+            if verbose:
                 print("程序退出")
             sys.exit(1)
 
 
+# 每个进程持有一个可视化器，在分到的多个种子之间复用
+_worker_visualizer = None
+
+
+def _init_worker():
+    """初始化生成地图的进程：工作进程只做离屏渲染，强制使用Agg后端"""
+    import matplotlib
+
+    # 导入map_visualizer会再次检测运行环境（WSL下可能切换到TkAgg并打印提示），
+    # 丢弃这些输出，导入后再强制切回Agg
+    with contextlib.redirect_stdout(io.StringIO()):
+        import src.map_visualizer  # noqa: F401
+    matplotlib.use("Agg", force=True)
+
+
+def _generate_one(job):
+    """生成并导出单个种子的地图（进程池任务，需保持为顶层函数以便pickle）
+
+    地图统计等输出不直接打印，而是作为返回值交给主进程按种子顺序打印，
+    避免多个进程的输出相互交错。
+    """
+    global _worker_visualizer
+    seed, width, height, output_dir, phase, export = job
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        if _worker_visualizer is None:
+            _init_worker()
+            from src.map_visualizer import MapVisualizer
+
+            # 构造时即按该种子生成地图
+            _worker_visualizer = MapVisualizer(
+                width=width,
+                height=height,
+                headless=True,
+                output_dir=output_dir,
+                phase=phase,
+                seed=seed,
+            )
+        else:
+            _worker_visualizer.current_seed = seed
+            _worker_visualizer._generate_and_display()
+
+        if export:
+            _worker_visualizer._export_map()
+
+    return seed, output.getvalue()
+
+
 def run_headless_mode(config: AppConfig):
     """运行无GUI模式"""
-    from src.map_visualizer import MapVisualizer
+    # 输出模式在运行期间不变，只查询一次
+    verbose = config.is_verbose_output()
 
-    if config.is_verbose_output():
+    if verbose:
         print()
         print("=== 无GUI模式 ===")
 
@@ -149,10 +206,10 @@ def run_headless_mode(config: AppConfig):
     # 创建输出目录
     if output_dir != "." and not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
-        if config.is_verbose_output():
+        if verbose:
             print(f"✅ 创建输出目录: {output_dir}")
 
-    if config.is_verbose_output():
+    if verbose:
         print(f"将生成{len(seeds)}个不同种子的地图并自动保存")
         print(f"地图尺寸: {tile_width}x{tile_height} 瓦片")
         if phase is not None:
@@ -161,30 +218,36 @@ def run_headless_mode(config: AppConfig):
             print(f"输出目录: {output_dir}")
         print()
 
-    for i, seed in enumerate(seeds, 1):
-        if config.is_verbose_output():
-            print(f"[{i}/{len(seeds)}] 生成地图 (种子: {seed})...")
-
-        # 转换为像素尺寸（逐格子系统）
-        width = tile_width * 8
-        height = tile_height * 8
-        visualizer = MapVisualizer(
-            width=width,
-            height=height,
-            headless=True,
-            output_dir=output_dir,
-            phase=phase,
-        )
-        visualizer.current_seed = seed
-        visualizer._generate_and_display()
-
-        if config.should_auto_export_headless():
-            visualizer._export_map()
-
-        if config.is_verbose_output():
-            print()
-
-    if config.is_verbose_output():
+    # 转换为像素尺寸（逐格子系统）
+    width = tile_width * 8
+    height = tile_height * 8
+
+    job_args = (width, height, output_dir, phase, config.should_auto_export_headless())
+    jobs = [(seed,) + job_args for seed in seeds]
+
+    # 各种子互不依赖，多个种子时分发到进程池并行生成
+    processes = min(len(jobs), os.cpu_count() or 1)
+    if processes > 1:
+        if verbose:
+            print(f"使用{processes}个进程并行生成...")
+        with mp.Pool(processes, initializer=_init_worker) as pool:
+            # imap按提交顺序返回结果，各种子的输出按顺序整段打印
+            for i, (seed, output) in enumerate(pool.imap(_generate_one, jobs), 1):
+                if verbose:
+                    print(f"[{i}/{len(seeds)}] 地图生成完成 (种子: {seed})")
+                print(output, end="")
+                if verbose:
+                    print()
+    else:
+        for i, job in enumerate(jobs, 1):
+            if verbose:
+                print(f"[{i}/{len(seeds)}] 生成地图 (种子: {job[0]})...")
+            _, output = _generate_one(job)
+            print(output, end="")
+            if verbose:
+                print()
+
+    if verbose:
         print("✅ 所有地图已生成完成!")
         # 无GUI模式默认保存到output目录
         if output_dir == ".":
@@ -193,6 +256,7 @@ def run_headless_mode(config: AppConfig):
             actual_output_path = output_dir
         print(f"文件保存在{actual_output_path}:")
         print("  • YYYYMMDD_HHMMSS_seed_*.json (地图数据)")
+        print("  • YYYYMMDD_HHMMSS_seed_*.npz (地形编码数组)")
         print("  • YYYYMMDD_HHMMSS_seed_*.png (地图图像)")
 
         # 显示WSL配置提示
@@ -219,7 +283,9 @@ def main():
     args = parser.parse_args()
 
     # 加载配置，传入命令行参数
-    config = AppConfig(args=args)
+    config = AppConfig.get_instance(args=args)
+
+    verbose = config.is_verbose_output()
 
     # 打印横幅
     print_banner(config)
@@ -229,11 +295,11 @@ def main():
 
     # 决定运行模式
     if not config.is_gui_enabled():
-        if config.is_verbose_output():
+        if verbose:
             print("🔧 配置禁用GUI，运行无GUI模式")
         run_headless_mode(config)
     elif not gui_available:
-        if config.is_verbose_output():
+        if verbose:
             print("🔧 GUI不可用，运行无GUI模式")
         run_headless_mode(config)
     else:
@@ -241,7 +307,7 @@ def main():
         choice = get_user_choice(config)
 
         if choice == "2":
-            if config.is_verbose_output():
+            if verbose:
                 print("用户选择无GUI模式...")
             run_headless_mode(config)
         else:
@@ -3,43 +3,238 @@
 应用配置加载器 - 简化版
 """
 
-import argparse
+from __future__ import annotations
+
 import json
+import mmap
 import os
-from typing import Dict, Any, List, Optional, Tuple
+import random
+import re
+import sys
+from functools import lru_cache
+from types import SimpleNamespace
+
+# 注解不在运行时求值，typing和argparse只供类型检查器使用，运行时不导入
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import argparse
+    from typing import Any, Dict, Optional, Tuple
+
+try:
+    # 可选依赖：orjson直接解析UTF-8字节，比标准库更快
+    from orjson import loads as _json_loads
+
+    # orjson可以直接解析内存映射的缓冲区，无需先复制成bytes
+    _LOADS_ACCEPTS_BUFFER = True
+except ImportError:
+    # 标准库json.loads同样接受UTF-8字节
+    _json_loads = json.loads
+    _LOADS_ACCEPTS_BUFFER = False
+
+# 达到该大小的配置文件通过mmap零拷贝解析，小文件直接read更快
+_MMAP_MIN_SIZE = 64 * 1024
+
+
+# 默认配置文件路径：项目根目录下的config/config.json
+_DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "config.json"
+)
+
+# 已解析配置的缓存：(绝对路径, 修改时间, 文件大小) -> 配置字典，文件修改后自动失效
+_CONFIG_CACHE: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+
+# 常用的展开后配置键，驻留后与_flat中的键是同一对象，字典查找直接按身份命中
+_UI_ENABLE_GUI = sys.intern("ui.enable_gui")
+
+# 批量生成时随机种子的取值范围
+_SEED_RANGE = range(1, 1000000)
+
+# 地图尺寸参数格式：宽x高，例如 16x12
+_SIZE_RE = re.compile(r"(\d+)x(\d+)")
+
+# 命令行帮助文本（模块级常量，解析器构建时直接引用）
+_DESCRIPTION = "暗黑2风格地图生成工具"
+
+_EPILOG = """
+示例用法:
+  %(prog)s                              # GUI模式 (默认)
+  %(prog)s --headless                   # 无GUI模式，生成默认地图
+  %(prog)s --headless --seed 42         # 指定种子生成单个地图
+  %(prog)s --headless --batch 5         # 批量生成5个随机地图
+  %(prog)s --headless --size 16x12      # 指定地图尺寸
+  %(prog)s --headless --quiet           # 安静模式运行
+  %(prog)s --headless --output ./maps   # 指定输出目录
+  %(prog)s --config ./my_config.json    # 使用指定的配置文件
+  %(prog)s --no-config                  # 忽略配置文件，使用默认设置
+"""
+
+_HELP = {
+    "headless": "无GUI模式运行 (批量生成)",
+    "config": "配置文件路径 (默认: config/config.json)",
+    "no_config": "不读取配置文件，全部使用默认设置",
+    "seed": "指定地图生成种子 (整数)",
+    "batch": "批量生成N个地图 (仅无GUI模式)",
+    "size": "地图尺寸，格式为 宽x高 (例如: 16x12)",
+    "phase": "指定地形生成阶段 (1-3)",
+    "output": "输出目录路径",
+    "verbose": "详细输出模式",
+    "quiet": "安静模式 (最少输出)",
+}
+
+# 进程内共享的AppConfig实例：配置文件路径 -> 实例
+_INSTANCES: Dict[str, AppConfig] = {}
+
+
+def _flatten(config: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """将嵌套配置展开为单层字典，键用'.'连接，例如 "ui.enable_gui" """
+    flat = {}
+    for key, value in config.items():
+        flat_key = sys.intern(f"{prefix}{key}")
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{flat_key}."))
+        else:
+            flat[flat_key] = value
+    return flat
 
 
 class AppConfig:
+    # 属性固定，使用__slots__省去实例字典
+    __slots__ = (
+        "config_path",
+        "config",
+        "_flat",
+        "args",
+        "_gui_enabled",
+        "_map_size",
+        "_batch_seeds",
+        "_verbose",
+        "_output_dir",
+        "_phase",
+    )
+
     def __init__(self, config_path: str = None, args: argparse.Namespace = None):
-        if config_path is None:
-            # 获取项目根目录的config文件夹路径
-            current_dir = os.path.dirname(__file__)
-            project_root = os.path.dirname(current_dir)
-            config_path = os.path.join(project_root, "config", "config.json")
-        self.config_path = config_path
-        self.config = self._load_config()
-        self.args = args or argparse.Namespace()
+        # 未传入命令行参数时使用空命名空间，各项设置都取默认值
+        self.args = args or SimpleNamespace()
+        # 配置文件路径优先级：显式参数 > --config > 默认路径
+        self.config_path = (
+            config_path or getattr(self.args, "config", None) or _DEFAULT_CONFIG_PATH
+        )
+        # config保留原始嵌套结构，设置项查询使用展开后的_flat
+        self.config = self._load_config() if self._needs_config_file() else {}
+        self._flat = _flatten(self.config)
+        self._resolve()
+
+    @classmethod
+    def get_instance(
+        cls, config_path: str = None, args: argparse.Namespace = None
+    ) -> AppConfig:
+        """获取进程内共享的配置实例（按配置文件路径区分，args只在首次创建时生效）"""
+        config_path = (
+            config_path or getattr(args, "config", None) or _DEFAULT_CONFIG_PATH
+        )
+        instance = _INSTANCES.get(config_path)
+        if instance is None:
+            instance = cls(config_path=config_path, args=args)
+            _INSTANCES[config_path] = instance
+        return instance
+
+    def _needs_config_file(self) -> bool:
+        """判断是否需要读取配置文件
+
+        配置文件目前只提供ui.enable_gui，指定--headless时该值已被命令行覆盖，
+        指定--no-config时显式使用默认设置，两种情况都跳过文件读取和解析。
+        """
+        if getattr(self.args, "no_config", False):
+            return False
+        if getattr(self.args, "headless", False) or getattr(self.args, "no_gui", False):
+            return False
+        return True
 
     def _load_config(self) -> Dict[str, Any]:
-        """加载配置文件"""
+        """加载配置文件（按修改时间缓存解析结果，调用方不应修改返回的字典）"""
         try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            stat = os.stat(self.config_path)
+            # 修改时间精度不足时，文件大小可以额外识别同一时刻内的改写
+            cache_key = (
+                os.path.abspath(self.config_path),
+                stat.st_mtime_ns,
+                stat.st_size,
+            )
+            if cache_key in _CONFIG_CACHE:
+                return _CONFIG_CACHE[cache_key]
+
+            # 以二进制读取，交给解析器直接处理字节，省去文本层解码
+            with open(self.config_path, "rb") as f:
+                if _LOADS_ACCEPTS_BUFFER and stat.st_size >= _MMAP_MIN_SIZE:
+                    config = self._parse_mapped(f)
+                else:
+                    config = _json_loads(f.read())
+            _CONFIG_CACHE[cache_key] = config
+            return config
         except FileNotFoundError:
             print(f"警告: 配置文件 {self.config_path} 未找到，使用默认配置")
             return {"ui": {"enable_gui": True}}
-        except json.JSONDecodeError as e:
+        except json.JSONDecodeError as e:  # orjson.JSONDecodeError是其子类
             print(f"警告: 配置文件格式错误: {e}，使用默认配置")
             return {"ui": {"enable_gui": True}}
 
+    @staticmethod
+    def _parse_mapped(f) -> Dict[str, Any]:
+        """将配置文件映射到内存后直接解析，不经过中间的bytes缓冲区"""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise") and hasattr(mmap, "MADV_WILLNEED"):
+                # 提示内核预读整个文件，减少解析时的缺页中断
+                mm.madvise(mmap.MADV_WILLNEED)
+            # 关闭映射前必须先释放memoryview
+            with memoryview(mm) as view:
+                return _json_loads(view)
+
+    def _resolve(self):
+        """合并命令行参数和配置文件，一次性计算各项设置（运行期间不再变化）"""
+        args = self.args
+
+        # 命令行参数优先于配置文件
+        if getattr(args, "headless", False) or getattr(args, "no_gui", False):
+            self._gui_enabled = False
+        else:
+            self._gui_enabled = self._flat.get(_UI_ENABLE_GUI, True)
+
+        # 检查命令行参数中的size设置
+        self._map_size = (12, 10)
+        size = getattr(args, "size", None)
+        if size:
+            match = _SIZE_RE.fullmatch(size.strip())
+            if match:
+                self._map_size = (int(match.group(1)), int(match.group(2)))
+            else:
+                print(f"警告: 无效的尺寸格式 '{size}', 使用默认尺寸")
+
+        # 批量种子在此抽取一次，之后多次查询得到相同的种子列表
+        seed = getattr(args, "seed", None)
+        batch = getattr(args, "batch", None)
+        if seed is not None:
+            self._batch_seeds = [seed]
+        elif batch is not None:
+            batch = max(batch, 0)
+            if batch <= len(_SEED_RANGE):
+                # 生成指定数量的随机种子（不放回抽样，避免重复种子生成相同地图）
+                self._batch_seeds = random.sample(_SEED_RANGE, batch)
+            else:
+                # 数量超过种子范围时无法不重复，退回有放回抽样
+                print(f"警告: 批量数量 {batch} 超过可用种子数 {len(_SEED_RANGE)}，种子可能重复")
+                self._batch_seeds = random.choices(_SEED_RANGE, k=batch)
+        else:
+            self._batch_seeds = [42, 123, 456]
+
+        # 检查quiet参数（verbose与默认值都是详细输出）
+        self._verbose = not getattr(args, "quiet", False)
+
+        self._output_dir = getattr(args, "output", None) or "."
+        self._phase = getattr(args, "phase", None)
+
     def is_gui_enabled(self) -> bool:
         """是否启用GUI"""
-        # 命令行参数优先于配置文件
-        if hasattr(self.args, "headless") and self.args.headless:
-            return False
-        if hasattr(self.args, "no_gui") and self.args.no_gui:
-            return False
-        return self.config.get("ui", {}).get("enable_gui", True)
+        return self._gui_enabled
 
     # 硬编码的默认配置
     def should_auto_detect_environment(self) -> bool:
@@ -52,25 +247,10 @@ class AppConfig:
         return False
 
     def get_default_map_size(self) -> tuple:
-        # 检查命令行参数中的size设置
-        if hasattr(self.args, "size") and self.args.size:
-            try:
-                width, height = map(int, self.args.size.split("x"))
-                return (width, height)
-            except (ValueError, AttributeError):
-                print(f"警告: 无效的尺寸格式 '{self.args.size}', 使用默认尺寸")
-        return (12, 10)
+        return self._map_size
 
     def get_headless_batch_seeds(self) -> list:
-        # 检查命令行参数
-        if hasattr(self.args, "seed") and self.args.seed is not None:
-            return [self.args.seed]
-        if hasattr(self.args, "batch") and self.args.batch is not None:
-            # 生成指定数量的随机种子
-            import random
-
-            return [random.randint(1, 999999) for _ in range(self.args.batch)]
-        return [42, 123, 456]
+        return self._batch_seeds
 
     def get_default_display(self) -> str:
         return ":0"
@@ -79,73 +259,66 @@ class AppConfig:
         return True
 
     def is_verbose_output(self) -> bool:
-        # 检查quiet参数
-        if hasattr(self.args, "quiet") and self.args.quiet:
-            return False
-        # 检查verbose参数
-        if hasattr(self.args, "verbose") and self.args.verbose:
-            return True
-        return True
+        return self._verbose
 
     def should_auto_export_headless(self) -> bool:
         return True
 
     def get_output_directory(self) -> str:
         """获取输出目录"""
-        if hasattr(self.args, "output") and self.args.output:
-            return self.args.output
-        return "."
+        return self._output_dir
     
     def get_phase(self) -> Optional[int]:
         """获取地形生成阶段"""
-        if hasattr(self.args, "phase") and self.args.phase is not None:
-            return self.args.phase
-        return None
+        return self._phase
 
     @staticmethod
+    @lru_cache(maxsize=1)
     def create_argument_parser() -> argparse.ArgumentParser:
-        """创建命令行参数解析器"""
+        """创建命令行参数解析器（只构建一次，调用方不应修改返回的解析器）"""
+        import argparse
+
         parser = argparse.ArgumentParser(
-            description="暗黑2风格地图生成工具",
+            description=_DESCRIPTION,
             formatter_class=argparse.RawDescriptionHelpFormatter,
-            epilog="""
-示例用法:
-  %(prog)s                              # GUI模式 (默认)
-  %(prog)s --headless                   # 无GUI模式，生成默认地图
-  %(prog)s --headless --seed 42         # 指定种子生成单个地图
-  %(prog)s --headless --batch 5         # 批量生成5个随机地图
-  %(prog)s --headless --size 16x12      # 指定地图尺寸
-  %(prog)s --headless --quiet           # 安静模式运行
-  %(prog)s --headless --output ./maps   # 指定输出目录
-            """,
+            epilog=_EPILOG,
         )
 
         # GUI控制
         gui_group = parser.add_mutually_exclusive_group()
         gui_group.add_argument(
-            "--headless", "--no-gui", action="store_true", help="无GUI模式运行 (批量生成)"
+            "--headless", "--no-gui", action="store_true", help=_HELP["headless"]
+        )
+
+        # 配置文件控制
+        config_group = parser.add_mutually_exclusive_group()
+        config_group.add_argument(
+            "--config", metavar="PATH", help=_HELP["config"]
+        )
+        config_group.add_argument(
+            "--no-config", action="store_true", help=_HELP["no_config"]
         )
 
         # 地图生成参数
-        parser.add_argument("--seed", type=int, help="指定地图生成种子 (整数)")
+        parser.add_argument("--seed", type=int, help=_HELP["seed"])
 
-        parser.add_argument("--batch", type=int, metavar="N", help="批量生成N个地图 (仅无GUI模式)")
+        parser.add_argument("--batch", type=int, metavar="N", help=_HELP["batch"])
 
-        parser.add_argument("--size", metavar="WxH", help="地图尺寸，格式为 宽x高 (例如: 16x12)")
+        parser.add_argument("--size", metavar="WxH", help=_HELP["size"])
 
-        parser.add_argument("--phase", type=int, metavar="N", help="指定地形生成阶段 (1-3)")
+        parser.add_argument("--phase", type=int, metavar="N", help=_HELP["phase"])
 
         # 输出控制
-        parser.add_argument("--output", "-o", metavar="DIR", help="输出目录路径")
+        parser.add_argument("--output", "-o", metavar="DIR", help=_HELP["output"])
 
         # 显示控制
         verbose_group = parser.add_mutually_exclusive_group()
         verbose_group.add_argument(
-            "--verbose", "-v", action="store_true", help="详细输出模式"
+            "--verbose", "-v", action="store_true", help=_HELP["verbose"]
         )
 
         verbose_group.add_argument(
-            "--quiet", "-q", action="store_true", help="安静模式 (最少输出)"
+            "--quiet", "-q", action="store_true", help=_HELP["quiet"]
         )
 
         return parser
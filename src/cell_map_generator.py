@@ -1,13 +1,89 @@
 #!/usr/bin/env python3
 
 import numpy as np
-import random
 import math
-from typing import List, Tuple, Optional, Dict, Set
+from bisect import bisect_right
+from collections import deque
+from itertools import accumulate
+from typing import List, Tuple, Optional, Dict
 from terrain_types import TerrainType, Cell
 from template_loader import TemplateLoader
 
 
+# 空格子在地形编码数组中的取值
+EMPTY_CODE = -1
+
+# 噪声引导参数：地形 -> (噪声尺度, 哈希偏移, 基础偏置, 噪声幅度)
+# 使用较大的噪声尺度来创建大片区域，未列出的地形偏置为1
+NOISE_BIAS_PARAMS = {
+    "highland": (80, 0, 0.6, 1.0),  # 降低影响强度
+    "forest": (70, 100, 0.6, 0.8),
+    "plain": (100, 200, 0.8, 0.6),  # 最大尺度，创建大片平原，平原更常见且稳定
+    "slope": (60, 300, 0.5, 0.8),
+    "cliff": (120, 400, 0.3, 0.5),  # 更大尺度，形成大片悬崖区域，悬崖比较稀少
+}
+
+# 值噪声格点哈希键中行号的乘数（大于地图宽度与格点偏移之和）
+NOISE_ROW_STRIDE = 1 << 16
+
+# 约束修复参数：违反约束的格子周围清空的初始半径，以及整图重试前的局部修复轮数
+REPAIR_RADIUS = 2
+MAX_REPAIR_ROUNDS = 3
+
+# 4邻域偏移量（上下左右），热点循环直接遍历，不构造邻居坐标列表
+NEIGHBOR_OFFSETS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
+
+def _build_neighbor_index(width: int, height: int) -> np.ndarray:
+    """构建4邻域的行优先下标表，形状为(高, 宽, 4)，越界的邻居为-1"""
+    ys, xs = np.meshgrid(np.arange(height), np.arange(width), indexing="ij")
+    neighbor_index = np.empty((height, width, len(NEIGHBOR_OFFSETS)), dtype=np.int32)
+    for k, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+        nx, ny = xs + dx, ys + dy
+        inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+        neighbor_index[:, :, k] = np.where(inside, ny * width + nx, -1)
+    return neighbor_index
+
+
+def _jenkins_hash(keys: np.ndarray) -> np.ndarray:
+    """对整数键做Jenkins one-at-a-time哈希的混合步骤（uint32，溢出自动回绕）"""
+    h = keys.astype(np.uint32)
+    h += h << np.uint32(10)
+    h ^= h >> np.uint32(6)
+    h += h << np.uint32(3)
+    h ^= h >> np.uint32(11)
+    h += h << np.uint32(15)
+    return h
+
+
+def _value_noise(width: int, height: int, scale: float, seed_offset: int) -> np.ndarray:
+    """基于整数格点哈希的值噪声，返回(height, width)、取值[0, 1]的数组
+
+    每隔scale个格子取一个格点，格点值由哈希得到，格点之间用smoothstep双线性插值。
+    哈希只在稀疏的格点上计算，再先沿x、后沿y插值放大到整张地图。
+    """
+    fx = np.arange(width) / scale
+    fy = np.arange(height) / scale
+    ix = np.floor(fx).astype(np.int64)
+    iy = np.floor(fy).astype(np.int64)
+    
+    # smoothstep平滑插值系数
+    tx = fx - ix
+    ty = fy - iy
+    tx = (tx * tx * (3 - 2 * tx))[None, :]
+    ty = (ty * ty * (3 - 2 * ty))[:, None]
+    
+    # 覆盖整张地图所需的格点值：(格点行数, 格点列数)
+    gx = np.arange(ix[-1] + 2)
+    gy = np.arange(iy[-1] + 2)
+    keys = gy[:, None] * NOISE_ROW_STRIDE + gx[None, :] + seed_offset
+    lattice = _jenkins_hash(keys) / np.float64(0xFFFFFFFF)
+    
+    # 每个格点行先沿x插值到地图宽度，再按格子所在的上下格点行沿y插值
+    rows = lattice[:, ix] * (1 - tx) + lattice[:, ix + 1] * tx
+    return rows[iy] * (1 - ty) + rows[iy + 1] * ty
+
+
 class CellBasedMap:
     """基于单格子的地图生成器"""
     
@@ -22,26 +98,43 @@ class CellBasedMap:
         self.height = height
         self.phase = phase
         
-        self.grid: List[List[Optional[Cell]]] = []
+        # 确保地形类型已初始化
+        TerrainType.initialize_from_config(phase=phase)
+        
+        # 网格以int8地形编码存储，Cell对象仅在get_cell时按需构造
+        # 开始时所有格子都是空的
+        self.terrain_codes = np.full((height, width), EMPTY_CODE, dtype=np.int8)
+        # 按行优先下标访问的一维视图（网格只原地修改，视图始终有效）
+        self._flat_codes = self.terrain_codes.ravel()
+        
+        self._prepare_static_tables()
+        
+        # 地图自身的随机数生成器，generate_map时按种子重建
+        self.rng = np.random.default_rng()
         
         # 使用模板加载器获取配置
         self.template_loader = TemplateLoader(phase=phase)
         
-        self._initialize_grid()
-        self._load_colors_from_config()
         self._load_terrain_config()
+        self._load_colors_from_config()
+        
+    def _prepare_static_tables(self):
+        """预先计算只取决于地图尺寸的查找表和缓冲区，多次生成和重试之间复用"""
+        # 邻居下标预先计算一次，逐格循环中不再做边界判断
+        self.neighbor_index = _build_neighbor_index(self.width, self.height)
+        # 热点循环使用的Python列表形式：每个格子的有效邻居行优先下标
+        self._neighbor_lists = [
+            [index for index in row if index >= 0]
+            for row in self.neighbor_index.reshape(-1, len(NEIGHBOR_OFFSETS)).tolist()
+        ]
+        
+        # 计算候选地形位掩码用的缓冲区
+        self._neighbor_bits_buf = np.empty((self.height, self.width), dtype=np.int64)
+        self._valid_mask_buf = np.empty((self.height, self.width), dtype=np.int64)
         
     def _initialize_grid(self):
-        """初始化空网格"""
-        # 确保地形类型已初始化
-        TerrainType.initialize_from_config(phase=self.phase)
-        
-        self.grid = []
-        for y in range(self.height):
-            row = []
-            for x in range(self.width):
-                row.append(None)  # 开始时所有格子都是空的
-            self.grid.append(row)
+        """清空网格（原地重置，不重新分配）"""
+        self.terrain_codes.fill(EMPTY_CODE)
             
     def _load_colors_from_config(self):
         """从配置文件加载颜色配置"""
@@ -52,191 +145,245 @@ class CellBasedMap:
         """从配置加载地形配置"""
         # 获取基础地形权重
         self.terrain_weights = self.template_loader.get_terrain_weights()
-        self.terrain_types = set(self.terrain_weights.keys())
+        
+        # 地形编码：terrain_codes中存放的是terrain_names的下标
+        # 内部全部按编码比较，地形名称只在对外接口处转换
+        self.terrain_names = list(self.terrain_weights.keys())
+        self.terrain_code_map = {
+            terrain: code for code, terrain in enumerate(self.terrain_names)
+        }
+        self.terrain_ids = np.arange(len(self.terrain_names))
+        
+        # 按地形编码索引的基础权重，以下各查找表都由它派生
+        self.base_weights = np.array(
+            [self.terrain_weights[t] for t in self.terrain_names], dtype=float
+        )
+        # 基础权重的累积和，供种子点地形抽样复用
+        self._base_weight_cumsum = np.cumsum(self.base_weights)
+        
+        # 邻居影响权重查找表：_neighbor_weight_lut[邻居数量, 地形编码]
+        # 第0行是非邻居地形的很小基础权重，第n行是基础权重 * 邻居影响强度^n
+        neighbor_influence = 50.0  # 大幅提高邻居影响强度
+        # 没有有效地形时使用的权重最高的地形编码（并列时取编码最小的）
+        self._default_code = int(np.argmax(self.base_weights))
+        self._neighbor_weight_lut = np.array(
+            [np.full_like(self.base_weights, 0.01)]
+            + [self.base_weights * neighbor_influence ** count
+               for count in range(1, len(NEIGHBOR_OFFSETS) + 1)]
+        )
+        
+        # 噪声只与坐标有关，按地图尺寸一次性预计算
+        self._precompute_noise_field()
+        
+        # 地图内部编码 -> TerrainType全局编码的查找表（供to_array使用）
+        # 末尾追加的0供EMPTY_CODE(-1)索引，空格子输出为0
+        self._type_code_lut = np.array(self._get_type_codes() + [0], dtype=int)
             
-        # 获取兼容性规则
-        self.compatibility_rules = set()
+        # 获取兼容性规则，预计算为按地形编码索引的布尔矩阵（同种地形总是兼容）
+        terrain_count = len(self.terrain_names)
+        self.compatibility_matrix = np.eye(terrain_count, dtype=bool)
         compatibility_config = self.template_loader.get_edge_compatibility()
         for pair in compatibility_config:
             if len(pair) == 2:
                 terrain1, terrain2 = pair
-                self.compatibility_rules.add((terrain1, terrain2))
-                self.compatibility_rules.add((terrain2, terrain1))
+                if terrain1 in self.terrain_code_map and terrain2 in self.terrain_code_map:
+                    code1 = self.terrain_code_map[terrain1]
+                    code2 = self.terrain_code_map[terrain2]
+                    self.compatibility_matrix[code1, code2] = True
+                    self.compatibility_matrix[code2, code1] = True
+        
+        # 兼容矩阵的位掩码形式：第code个整数的第k位表示地形code与k兼容
+        self._compatible_bits = [
+            sum(1 << int(k) for k in np.flatnonzero(row))
+            for row in self.compatibility_matrix
+        ]
+        self._all_terrain_bits = (1 << terrain_count) - 1
+        # 按地形编码查兼容位掩码，末尾追加的全1掩码供EMPTY_CODE(-1)索引：空邻居不限制候选地形
+        self._compatible_bits_lut = np.array(
+            self._compatible_bits + [self._all_terrain_bits], dtype=np.int64
+        )
                 
         # 获取生成规则
         self.generation_rules = self.template_loader.get_generation_rules()
         
+        # 生成规则中的必需邻居转换为编码：地形编码 -> 必需的邻居地形编码列表
+        # 未知的必需地形记为None，它不可能出现在邻居中
+        self._must_have_codes = {}
+        for terrain, rules in self.generation_rules.items():
+            code = self.terrain_code_map.get(terrain)
+            must_have = rules.get("required_neighbors", {}).get("must_have")
+            if code is not None and must_have:
+                self._must_have_codes[code] = [
+                    self.terrain_code_map.get(required) for required in must_have
+                ]
+        
+        # 需要检查约束的地形位掩码（第code位对应地形编码code），其余地形跳过约束验证
+        self._rule_bits = sum(1 << code for code in self._must_have_codes)
+        
         # 获取区域生成配置
         self.region_config = self.template_loader.get_region_generation_config()
         
     def get_neighbors(self, x: int, y: int) -> List[Tuple[int, int]]:
-        """获取邻居坐标（4邻域）"""
+        """获取邻居坐标（4邻域，供外部调用；内部循环直接使用预先计算的邻居下标）"""
         neighbors = []
-        directions = [(0, -1), (0, 1), (-1, 0), (1, 0)]  # 上下左右
         
-        for dx, dy in directions:
+        for dx, dy in NEIGHBOR_OFFSETS:
             nx, ny = x + dx, y + dy
             if 0 <= nx < self.width and 0 <= ny < self.height:
                 neighbors.append((nx, ny))
         return neighbors
         
-    def get_neighbor_terrains(self, x: int, y: int) -> Dict[str, int]:
-        """获取邻居地形统计"""
-        neighbor_count = {}
-        
-        for nx, ny in self.get_neighbors(x, y):
-            cell = self.grid[ny][nx]
-            if cell is not None:
-                terrain = cell.terrain_type
-                neighbor_count[terrain] = neighbor_count.get(terrain, 0) + 1
+    def _get_neighbor_codes(self, x: int, y: int) -> List[int]:
+        """获取已放置邻居的地形编码"""
+        return self._neighbor_codes_at(y * self.width + x)
+        
+    def _neighbor_codes_at(self, index: int) -> List[int]:
+        """按行优先下标获取已放置邻居的地形编码"""
+        neighbor_codes = []
+        codes = self._flat_codes
+        
+        for neighbor in self._neighbor_lists[index]:
+            code = codes[neighbor]
+            if code != EMPTY_CODE:
+                neighbor_codes.append(int(code))
                 
-        return neighbor_count
+        return neighbor_codes
+        
+    def _neighbor_counts(self, x: int, y: int) -> np.ndarray:
+        """获取各地形的已放置邻居数量（按地形编码索引）"""
+        return np.bincount(
+            self._get_neighbor_codes(x, y), minlength=len(self.terrain_names)
+        )
+        
+    def get_neighbor_terrains(self, x: int, y: int) -> Dict[str, int]:
+        """获取邻居地形统计（供外部调用，内部直接使用按编码索引的数量数组）"""
+        neighbor_counts = self._neighbor_counts(x, y)
+        return {
+            self.terrain_names[code]: int(neighbor_counts[code])
+            for code in np.flatnonzero(neighbor_counts)
+        }
         
     def is_compatible(self, terrain1: str, terrain2: str) -> bool:
         """检查两个地形是否兼容"""
         if terrain1 == terrain2:
             return True
-        return (terrain1, terrain2) in self.compatibility_rules
-        
-    def calculate_terrain_weights(self, x: int, y: int) -> Dict[str, float]:
-        """计算当前位置各地形的权重"""
-        neighbor_terrains = self.get_neighbor_terrains(x, y)
-        
-        # 如果有邻居地形，强烈倾向于使用邻居地形
-        if neighbor_terrains:
-            weights = {}
-            for terrain in self.terrain_types:
-                weights[terrain] = 0.01  # 给非邻居地形很小的基础权重
-            
-            # 大幅增强邻居地形的权重
-            neighbor_influence = 50.0  # 大幅提高邻居影响强度
-            for terrain, count in neighbor_terrains.items():
-                if terrain in weights:
-                    weights[terrain] = self.terrain_weights.get(terrain, 1.0) * (neighbor_influence ** count)
-            
-            return weights
-        else:
-            # 如果没有邻居，使用原始权重（但此情况在填充阶段很少见）
-            base_weights = self.terrain_weights.copy()
-            
-            # 添加噪声引导
-            noise_weights = self._get_noise_bias(x, y)
-            for terrain in base_weights:
-                if terrain in noise_weights:
-                    base_weights[terrain] *= noise_weights[terrain]
-                    
-            return base_weights
-        
-    def _get_noise_bias(self, x: int, y: int) -> Dict[str, float]:
-        """使用噪声函数引导大尺度地形分布"""
-        # 简单的伪噪声函数（可以替换为真正的Perlin噪声）
-        def simple_noise(x, y, scale, seed_offset=0):
-            return (math.sin(x / scale + seed_offset) * math.cos(y / scale + seed_offset) + 1) / 2
-            
-        noise_bias = {}
-        
-        # 使用更大的噪声尺度来创建大片区域
-        if "highland" in self.terrain_types:
-            highland_noise = simple_noise(x, y, 80, 0)
-            noise_bias["highland"] = 0.6 + highland_noise * 1.0  # 降低影响强度
-            
-        if "forest" in self.terrain_types:
-            forest_noise = simple_noise(x, y, 70, 100)  
-            noise_bias["forest"] = 0.6 + forest_noise * 0.8
-            
-        if "plain" in self.terrain_types:
-            plain_noise = simple_noise(x, y, 100, 200)  # 最大尺度，创建大片平原
-            noise_bias["plain"] = 0.8 + plain_noise * 0.6  # 平原更常见且稳定
-            
-        if "slope" in self.terrain_types:
-            slope_noise = simple_noise(x, y, 60, 300)
-            noise_bias["slope"] = 0.5 + slope_noise * 0.8
-            
-        if "cliff" in self.terrain_types:
-            cliff_noise = simple_noise(x, y, 120, 400)  # 更大尺度，形成大片悬崖区域
-            noise_bias["cliff"] = 0.3 + cliff_noise * 0.5  # 悬崖比较稀少
+        code1 = self.terrain_code_map.get(terrain1)
+        code2 = self.terrain_code_map.get(terrain2)
+        if code1 is None or code2 is None:
+            return False
+        return bool(self.compatibility_matrix[code1, code2])
+        
+    def calculate_terrain_weights(self, x: int, y: int) -> np.ndarray:
+        """计算当前位置各地形的权重（按地形编码索引的数组）"""
+        neighbor_counts = self._neighbor_counts(x, y)
+        
+        # 如果有邻居地形，强烈倾向于使用邻居地形：按各地形的邻居数量查表
+        if neighbor_counts.any():
+            return self._neighbor_weight_lut[neighbor_counts, self.terrain_ids]
+        
+        # 如果没有邻居，使用原始权重（但此情况在填充阶段很少见）并添加噪声引导
+        return self._noise_weight_field[y, x].copy()
+        
+    def _precompute_noise_field(self):
+        """预计算噪声偏置场：noise_bias_field[y, x, 地形编码]"""
+        self.noise_bias_field = np.ones(
+            (self.height, self.width, len(self.terrain_names))
+        )
+        for code, terrain in enumerate(self.terrain_names):
+            if terrain not in NOISE_BIAS_PARAMS:
+                continue
+            scale, offset, base, amplitude = NOISE_BIAS_PARAMS[terrain]
+            noise = _value_noise(self.width, self.height, scale, offset)
+            self.noise_bias_field[:, :, code] = base + noise * amplitude
             
-        return noise_bias
+        # 没有邻居时的权重 = 基础权重 * 噪声偏置，同样只与坐标有关，一并预计算
+        self._noise_weight_field = self.noise_bias_field * self.base_weights
         
     def validate_terrain_constraints(self, terrain: str, x: int, y: int) -> bool:
         """验证地形约束条件"""
-        if terrain not in self.generation_rules:
+        code = self.terrain_code_map.get(terrain)
+        if code is None:
             return True
-            
-        rules = self.generation_rules[terrain]
+        return self._validate_code_constraints(code, x, y)
         
+    def _validate_code_constraints(self, code: int, x: int, y: int) -> bool:
+        """按地形编码验证约束条件"""
+        must_have_codes = self._must_have_codes.get(code)
+        if not must_have_codes:
+            return True
+            
         # 检查必须拥有的邻居类型
-        if "required_neighbors" in rules:
-            neighbor_requirements = rules["required_neighbors"]
-            if "must_have" in neighbor_requirements:
-                must_have_types = neighbor_requirements["must_have"]
-                neighbor_terrains = self.get_neighbor_terrains(x, y)
-                
-                for required_type in must_have_types:
-                    if required_type not in neighbor_terrains:
-                        # 检查是否可以通过未来放置满足要求
-                        if not self._can_satisfy_requirement(required_type, x, y):
-                            return False
-                            
+        neighbor_codes = self._get_neighbor_codes(x, y)
+        for required_code in must_have_codes:
+            if required_code not in neighbor_codes:
+                # 检查是否可以通过未来放置满足要求
+                if not self._can_satisfy_requirement(required_code, x, y):
+                    return False
+                    
         return True
         
-    def _can_satisfy_requirement(self, required_terrain: str, x: int, y: int) -> bool:
+    def _can_satisfy_requirement(self, required_code: Optional[int], x: int, y: int) -> bool:
         """检查是否能通过未来的格子满足约束要求"""
-        for nx, ny in self.get_neighbors(x, y):
-            if self.grid[ny][nx] is None:  # 空格子
+        codes = self._flat_codes
+        for neighbor in self._neighbor_lists[y * self.width + x]:
+            if codes[neighbor] == EMPTY_CODE:  # 空格子
                 # 检查这个空格子是否可能放置需要的地形
-                empty_neighbor_terrains = self.get_neighbor_terrains(nx, ny)
+                empty_neighbor_codes = self._neighbor_codes_at(neighbor)
                 # 简化检查：如果需要的地形与现有邻居兼容，认为可以满足
-                compatible = True
-                for existing_terrain in empty_neighbor_terrains:
-                    if not self.is_compatible(required_terrain, existing_terrain):
-                        compatible = False
-                        break
+                if required_code is None:
+                    compatible = not empty_neighbor_codes
+                else:
+                    compatible = self.compatibility_matrix[
+                        required_code, empty_neighbor_codes
+                    ].all()
                 if compatible:
                     return True
         return False
         
     def get_valid_terrains(self, x: int, y: int) -> List[str]:
         """获取当前位置可放置的地形类型"""
-        valid_terrains = []
-        
-        neighbor_terrains = self.get_neighbor_terrains(x, y)
-        
-        for terrain in self.terrain_types:
-            # 检查与所有邻居的兼容性
-            compatible_with_all = True
-            for neighbor_terrain in neighbor_terrains:
-                if not self.is_compatible(terrain, neighbor_terrain):
-                    compatible_with_all = False
-                    break
-                    
-            if not compatible_with_all:
-                continue
-                
-            # 检查约束条件
-            if not self.validate_terrain_constraints(terrain, x, y):
+        return [self.terrain_names[code] for code in self._get_valid_codes(x, y)]
+        
+    def _get_valid_codes(self, x: int, y: int) -> List[int]:
+        """获取当前位置可放置的地形编码"""
+        valid_codes = []
+        
+        # 与所有邻居都兼容的地形：各邻居兼容位掩码的按位与
+        mask = self._all_terrain_bits
+        for neighbor_code in self._get_neighbor_codes(x, y):
+            mask &= self._compatible_bits[neighbor_code]
+        
+        rule_bits = self._rule_bits
+        while mask:
+            # 逐个取出最低的置位，即按编码从小到大遍历候选地形
+            code = (mask & -mask).bit_length() - 1
+            mask &= mask - 1
+            
+            # 检查约束条件（没有规则的地形无需检查）
+            if rule_bits >> code & 1 and not self._validate_code_constraints(code, x, y):
                 continue
                 
-            valid_terrains.append(terrain)
+            valid_codes.append(code)
             
-        return valid_terrains
+        return valid_codes
         
     def _place_region_seeds(self) -> List[Tuple[int, int, str]]:
         """在地图上放置区域种子点（固定数量，优化分布）"""
-        seeds = []
-        
         # 从配置获取参数
         target_count = self.region_config.get("target_region_count", 7)
         min_distance_ratio = self.region_config.get("min_region_distance", 0.15)
         max_attempts = self.region_config.get("max_placement_attempts", 100)
         
-        # 计算实际最小距离
+        # 已放置种子点的坐标和地形编码（按列分开存放，便于一次计算所有距离）
+        seed_x = np.empty(target_count, dtype=np.int32)
+        seed_y = np.empty(target_count, dtype=np.int32)
+        seed_codes = np.empty(target_count, dtype=np.int8)
+        seed_count = 0
+        
+        # 计算实际最小距离（比较距离平方，省去开方）
         map_diagonal = math.sqrt(self.width ** 2 + self.height ** 2)
         min_distance = map_diagonal * min_distance_ratio
-        
-        # 地形类型列表
-        terrain_list = list(self.terrain_types)
-        terrain_weights = [self.terrain_weights[t] for t in terrain_list]
+        min_distance_sq = min_distance ** 2
         
         # 边缘留白
         margin = min(self.width // 10, self.height // 10, 8)
@@ -246,117 +393,123 @@ class CellBasedMap:
         # 尝试放置种子点
         for seed_idx in range(target_count):
             best_pos = None
-            best_distance = 0
             
-            # 多次尝试找到最佳位置
-            for attempt in range(max_attempts):
-                # 使用分层网格优化分布
-                if seed_idx == 0:
-                    # 第一个种子点放在中心附近
-                    x = margin + safe_width // 2 + random.randint(-safe_width//4, safe_width//4)
-                    y = margin + safe_height // 2 + random.randint(-safe_height//4, safe_height//4)
-                else:
-                    # 后续种子点尽量分散
-                    x = margin + random.randint(0, safe_width - 1)
-                    y = margin + random.randint(0, safe_height - 1)
-                
+            if seed_count == 0:
+                # 第一个种子点放在中心附近，直接采用
+                x = margin + safe_width // 2 + int(self.rng.integers(-safe_width//4, safe_width//4 + 1))
+                y = margin + safe_height // 2 + int(self.rng.integers(-safe_height//4, safe_height//4 + 1))
+                best_pos = (
+                    max(margin, min(self.width - margin - 1, x)),
+                    max(margin, min(self.height - margin - 1, y)),
+                )
+            else:
+                # 后续种子点尽量分散：一次抽取全部候选位置，批量计算与现有种子点的最小距离平方
+                candidate_x = margin + self.rng.integers(0, safe_width, size=max_attempts)
+                candidate_y = margin + self.rng.integers(0, safe_height, size=max_attempts)
                 # 确保在有效范围内
-                x = max(margin, min(self.width - margin - 1, x))
-                y = max(margin, min(self.height - margin - 1, y))
+                np.clip(candidate_x, margin, self.width - margin - 1, out=candidate_x)
+                np.clip(candidate_y, margin, self.height - margin - 1, out=candidate_y)
                 
-                # 计算与现有种子点的最小距离
-                min_dist_to_existing = float('inf')
-                for existing_x, existing_y, _ in seeds:
-                    dist = math.sqrt((x - existing_x) ** 2 + (y - existing_y) ** 2)
-                    min_dist_to_existing = min(min_dist_to_existing, dist)
+                dx = candidate_x[:, None] - seed_x[:seed_count]
+                dy = candidate_y[:, None] - seed_y[:seed_count]
+                min_dist_sq = (dx * dx + dy * dy).min(axis=1)
                 
-                # 如果是第一个种子点或距离足够远
-                if len(seeds) == 0 or min_dist_to_existing >= min_distance:
-                    best_pos = (x, y)
-                    break
-                elif min_dist_to_existing > best_distance:
-                    # 记录当前最好的位置
-                    best_pos = (x, y)
-                    best_distance = min_dist_to_existing
+                # 取第一个距离足够远的候选位置，都不够远时取距离最大的候选位置
+                far_enough = np.flatnonzero(min_dist_sq >= min_distance_sq)
+                if far_enough.size:
+                    pick = int(far_enough[0])
+                else:
+                    pick = int(min_dist_sq.argmax())
+                    if min_dist_sq[pick] == 0:
+                        pick = None  # 所有候选位置都与现有种子点重合
+                if pick is not None:
+                    best_pos = (int(candidate_x[pick]), int(candidate_y[pick]))
             
             # 如果找到合适位置，添加种子点
             if best_pos:
-                x, y = best_pos
+                seed_x[seed_count], seed_y[seed_count] = best_pos
                 # 根据权重选择地形类型
-                terrain = random.choices(terrain_list, weights=terrain_weights)[0]
-                seeds.append((x, y, terrain))
+                seed_codes[seed_count] = self._sample_cumulative(self._base_weight_cumsum)
+                seed_count += 1
             else:
                 print(f"警告: 无法为第 {seed_idx + 1} 个种子点找到合适位置，跳过")
         
-        print(f"成功放置 {len(seeds)} 个种子点，目标是 {target_count} 个")
-        return seeds
+        print(f"成功放置 {seed_count} 个种子点，目标是 {target_count} 个")
+        return [
+            (int(x), int(y), self.terrain_names[code])
+            for x, y, code in zip(
+                seed_x[:seed_count], seed_y[:seed_count], seed_codes[:seed_count]
+            )
+        ]
         
     def _grow_regions_from_seeds(self, seeds: List[Tuple[int, int, str]]):
         """从种子点开始生长区域"""
         # 首先放置种子点
         for x, y, terrain in seeds:
             if 0 <= x < self.width and 0 <= y < self.height:
-                self.grid[y][x] = Cell(x, y, terrain)
+                self.terrain_codes[y, x] = self.terrain_code_map[terrain]
         
         # 使用队列进行广度优先搜索式的区域生长
+        # 队列项为(行优先下标, 地形编码, strength)，邻居直接查预先计算的下标列表
+        width = self.width
+        codes = self._flat_codes
+        neighbor_lists = self._neighbor_lists
         growth_queue = []
         
         # 将所有种子点加入生长队列
         for x, y, terrain in seeds:
             if 0 <= x < self.width and 0 <= y < self.height:
-                for nx, ny in self.get_neighbors(x, y):
-                    if self.grid[ny][nx] is None:  # 只考虑空格子
-                        growth_queue.append((nx, ny, terrain, 1.0))  # (x, y, terrain, strength)
+                code = self.terrain_code_map[terrain]
+                for neighbor in neighbor_lists[y * width + x]:
+                    if codes[neighbor] == EMPTY_CODE:  # 只考虑空格子
+                        growth_queue.append((neighbor, code, 1.0))
         
         # 随机打乱队列，避免过于规整的生长模式
-        random.shuffle(growth_queue)
+        self.rng.shuffle(growth_queue)
+        
+        # 生长参数（使用配置参数）
+        base_growth_strength = self.region_config.get("growth_strength", 0.95)
+        decay_rate = self.region_config.get("growth_decay", 0.95)
+        growth_threshold = self.region_config.get("growth_threshold", 0.05)
         
-        # 逐步生长区域
+        # 逐步生长区域：先进先出，新加入的邻居排在本轮之后，等价于逐层生长
+        growth_queue = deque(growth_queue)
         while growth_queue:
-            current_queue = growth_queue.copy()
-            growth_queue = []
+            index, code, strength = growth_queue.popleft()
+            if codes[index] != EMPTY_CODE:  # 已被占用
+                continue
+                
+            # 检查是否可以放置该地形
+            y, x = divmod(index, width)
+            if not self._can_place_terrain_at(x, y, code):
+                continue
             
-            for x, y, terrain, strength in current_queue:
-                if self.grid[y][x] is not None:  # 已被占用
-                    continue
-                    
-                # 检查是否可以放置该地形
-                if not self._can_place_terrain_at(x, y, terrain):
-                    continue
+            # 根据强度决定是否在此处生长
+            growth_probability = strength * base_growth_strength
+            if self.rng.random() < growth_probability:
+                codes[index] = code
                 
-                # 根据强度决定是否在此处生长（使用配置参数）
-                base_growth_strength = self.region_config.get("growth_strength", 0.95)
-                growth_probability = strength * base_growth_strength
-                if random.random() < growth_probability:
-                    self.grid[y][x] = Cell(x, y, terrain)
-                    
-                    # 将邻居加入下一轮生长队列（使用配置参数）
-                    decay_rate = self.region_config.get("growth_decay", 0.95)
-                    growth_threshold = self.region_config.get("growth_threshold", 0.05)
-                    new_strength = strength * decay_rate
-                    if new_strength > growth_threshold:
-                        for nx, ny in self.get_neighbors(x, y):
-                            if (0 <= nx < self.width and 0 <= ny < self.height and 
-                                self.grid[ny][nx] is None):
-                                growth_queue.append((nx, ny, terrain, new_strength))
+                # 将邻居加入下一轮生长队列
+                new_strength = strength * decay_rate
+                if new_strength > growth_threshold:
+                    for neighbor in neighbor_lists[index]:
+                        if codes[neighbor] == EMPTY_CODE:
+                            growth_queue.append((neighbor, code, new_strength))
     
-    def _can_place_terrain_at(self, x: int, y: int, terrain: str) -> bool:
-        """检查是否可以在指定位置放置地形"""
-        neighbor_terrains = self.get_neighbor_terrains(x, y)
-        
+    def _can_place_terrain_at(self, x: int, y: int, code: int) -> bool:
+        """检查是否可以在指定位置放置地形（按地形编码）"""
         # 检查与所有邻居的兼容性
-        for neighbor_terrain in neighbor_terrains:
-            if not self.is_compatible(terrain, neighbor_terrain):
-                return False
+        neighbor_codes = self._get_neighbor_codes(x, y)
+        if not self.compatibility_matrix[code, neighbor_codes].all():
+            return False
         
         # 检查约束条件
-        return self.validate_terrain_constraints(terrain, x, y)
+        return self._validate_code_constraints(code, x, y)
 
     def generate_map(self, seed: Optional[int] = None, max_retries: int = 10):
         """生成地图"""
-        if seed is not None:
-            random.seed(seed)
-            np.random.seed(seed)
+        # 每次生成使用独立的随机数生成器，不依赖也不影响全局随机状态
+        self.rng = np.random.default_rng(seed)
             
         # 尝试生成满足约束的地图
         for attempt in range(max_retries):
@@ -368,125 +521,272 @@ class CellBasedMap:
             self._grow_regions_from_seeds(seeds)
             
             # 第二阶段：填充剩余空格
-            for y in range(self.height):
-                for x in range(self.width):
-                    if self.grid[y][x] is not None:  # 已经有地形
-                        continue
-                        
-                    valid_terrains = self.get_valid_terrains(x, y)
-                    
-                    if not valid_terrains:
-                        # 如果没有有效地形，使用最常见的地形
-                        default_terrain = max(self.terrain_weights.items(), key=lambda x: x[1])[0]
-                        chosen_terrain = default_terrain
-                    else:
-                        # 根据权重选择地形
-                        weights = self.calculate_terrain_weights(x, y)
-                        valid_weights = [weights.get(terrain, 0.1) for terrain in valid_terrains]
-                        
-                        if sum(valid_weights) == 0:
-                            chosen_terrain = valid_terrains[0]
-                        else:
-                            chosen_terrain = random.choices(valid_terrains, weights=valid_weights)[0]
+            self._fill_empty_cells()
                     
-                    # 放置地形
-                    self.grid[y][x] = Cell(x, y, chosen_terrain)
-                    
-            # 验证最终约束
-            if self._validate_final_constraints():
+            # 验证最终约束，不满足时先在违反约束的格子周围局部修复，仍失败才整图重试
+            if self._repair_constraint_violations():
                 break
                 
             if attempt == max_retries - 1:
                 print(f"警告: 经过 {max_retries} 次尝试，可能存在未满足的约束")
                 
-    def _validate_final_constraints(self) -> bool:
-        """验证最终约束条件"""
-        for y in range(self.height):
-            for x in range(self.width):
-                cell = self.grid[y][x]
-                if cell and cell.terrain_type in self.generation_rules:
-                    if not self.validate_terrain_constraints(cell.terrain_type, x, y):
-                        return False
-        return True
+    def _compute_valid_masks(self) -> np.ndarray:
+        """计算每个格子与已放置邻居都兼容的地形位掩码（写入复用的缓冲区并返回）"""
+        bits = np.take(
+            self._compatible_bits_lut, self.terrain_codes, out=self._neighbor_bits_buf
+        )
+        
+        masks = self._valid_mask_buf
+        masks.fill(self._all_terrain_bits)
+        masks[1:, :] &= bits[:-1, :]  # 上邻居
+        masks[:-1, :] &= bits[1:, :]  # 下邻居
+        masks[:, 1:] &= bits[:, :-1]  # 左邻居
+        masks[:, :-1] &= bits[:, 1:]  # 右邻居
+        return masks
+        
+    def _fill_empty_cells(self):
+        """按行扫描顺序填充区域生长后剩余的空格子
+
+        逐格循环是整个生成过程的热点：循环内只读写Python列表形式的网格、兼容掩码和
+        权重查找表，避免逐个访问numpy标量的开销，放置结果同步写回terrain_codes。
+        每个格子的候选地形保存为位掩码，放置地形时只更新4个邻居的掩码。
+        """
+        width = self.width
+        terrain_codes = self.terrain_codes
+        # 网格和掩码按行优先下标展开，邻居直接查预先计算的下标列表
+        grid = terrain_codes.ravel().tolist()
+        valid_masks = self._compute_valid_masks().ravel().tolist()
+        neighbor_lists = self._neighbor_lists
+        noise_weight_field = self._noise_weight_field
+        compatible_bits = self._compatible_bits
+        weight_lut = self._neighbor_weight_lut.tolist()
+        all_codes = range(len(self.terrain_names))
+        # 位掩码 -> 候选地形编码列表，按需计算并缓存
+        mask_codes = {}
+        # (候选掩码或候选地形, 排序后的邻居编码) -> 候选地形的累积权重，按需计算并缓存
+        neighbor_cumulative = {}
+        # 有约束规则的地形位掩码：候选地形中没有这些地形时无需逐个验证约束
+        rule_bits = self._rule_bits
+        
+        # 填充不会产生新的空格，可以预先取出所有空格的行优先下标，跳过已填充格子
+        for index in np.flatnonzero(terrain_codes == EMPTY_CODE).tolist():
+            y, x = divmod(index, width)
+            neighbors = neighbor_lists[index]
+            
+            # 与所有邻居都兼容且满足约束的地形
+            mask = valid_masks[index]
+            valid_codes = mask_codes.get(mask)
+            if valid_codes is None:
+                valid_codes = [code for code in all_codes if mask >> code & 1]
+                mask_codes[mask] = valid_codes
+            constrained = mask & rule_bits
+            if constrained:
+                valid_codes = [
+                    code for code in valid_codes
+                    if not constrained >> code & 1
+                    or self._validate_code_constraints(code, x, y)
+                ]
+            
+            if not valid_codes:
+                chosen_code = self._default_code
+            elif len(valid_codes) == 1:
+                # 只有一种候选地形时无需计算权重和抽样
+                chosen_code = valid_codes[0]
+            else:
+                # 已放置的邻居编码
+                neighbor_codes = [
+                    grid[neighbor] for neighbor in neighbors
+                    if grid[neighbor] != EMPTY_CODE
+                ]
+                
+                # 根据权重选择地形：有邻居时累积权重只取决于候选地形和邻居编码，查缓存
+                # （有生成规则时候选地形还经过约束过滤，不能只用掩码区分）
+                if neighbor_codes:
+                    neighbor_codes.sort()
+                    cumulative_key = (
+                        tuple(valid_codes) if constrained else mask,
+                        tuple(neighbor_codes),
+                    )
+                    cumulative = neighbor_cumulative.get(cumulative_key)
+                    if cumulative is None:
+                        cumulative = list(accumulate(
+                            weight_lut[neighbor_codes.count(code)][code]
+                            for code in valid_codes
+                        ))
+                        neighbor_cumulative[cumulative_key] = cumulative
+                else:
+                    cumulative = list(accumulate(
+                        noise_weight_field[y, x, valid_codes].tolist()
+                    ))
+                
+                if cumulative[-1] == 0:
+                    chosen_code = valid_codes[0]
+                else:
+                    # 与_sample_cumulative相同的累积和抽样
+                    choice = bisect_right(cumulative, self.rng.random() * cumulative[-1])
+                    chosen_code = valid_codes[min(choice, len(valid_codes) - 1)]
+            
+            # 放置地形，并收窄4个邻居的候选地形掩码
+            grid[index] = chosen_code
+            terrain_codes[y, x] = chosen_code
+            chosen_bits = compatible_bits[chosen_code]
+            for neighbor in neighbors:
+                valid_masks[neighbor] &= chosen_bits
+            
+    def _sample_cumulative(self, cumulative: np.ndarray) -> int:
+        """按预先计算的累积权重随机抽取下标"""
+        index = np.searchsorted(
+            cumulative, self.rng.random() * cumulative[-1], side="right"
+        )
+        # 浮点误差可能使结果越界，限制在最后一个下标
+        return min(int(index), len(cumulative) - 1)
+                
+    def _find_constraint_violations(self) -> List[int]:
+        """找出违反约束条件的格子，返回行优先下标列表"""
+        # 没有任何约束规则时无需扫描网格
+        if not self._must_have_codes:
+            return []
+            
+        # 整图平移比较：标记缺少某个必需邻居地形的格子
+        codes = self.terrain_codes
+        missing = np.zeros(codes.shape, dtype=bool)
+        for code, required_codes in self._must_have_codes.items():
+            is_terrain = codes == code
+            if not is_terrain.any():
+                continue
+            for required_code in required_codes:
+                if required_code is None:  # 未知地形不可能出现在邻居中
+                    missing |= is_terrain
+                    continue
+                is_required = codes == required_code
+                has_required = np.zeros(codes.shape, dtype=bool)
+                has_required[1:, :] |= is_required[:-1, :]  # 上邻居
+                has_required[:-1, :] |= is_required[1:, :]  # 下邻居
+                has_required[:, 1:] |= is_required[:, :-1]  # 左邻居
+                has_required[:, :-1] |= is_required[:, 1:]  # 右邻居
+                missing |= is_terrain & ~has_required
+                
+        # 缺少必需邻居的格子逐个复查：还有空邻居时可能通过之后的放置满足要求
+        violations = []
+        for index in np.flatnonzero(missing).tolist():
+            y, x = divmod(index, self.width)
+            if not self._validate_code_constraints(int(self._flat_codes[index]), x, y):
+                violations.append(index)
+        return violations
+        
+    def _repair_constraint_violations(self) -> bool:
+        """局部修复违反约束的格子，返回最终是否满足所有约束
+
+        清空每个违反约束的格子周围的方形区域，由填充阶段按区域外已放置的邻居重新填充；
+        修复失败时逐轮扩大清空半径，共尝试MAX_REPAIR_ROUNDS轮。
+        """
+        violations = self._find_constraint_violations()
+        for repair_round in range(MAX_REPAIR_ROUNDS):
+            if not violations:
+                return True
+                
+            radius = REPAIR_RADIUS * (repair_round + 1)
+            for index in violations:
+                y, x = divmod(index, self.width)
+                self.terrain_codes[
+                    max(y - radius, 0):y + radius + 1, max(x - radius, 0):x + radius + 1
+                ] = EMPTY_CODE
+            self._fill_empty_cells()
+            violations = self._find_constraint_violations()
+            
+        return not violations
         
     def get_cell(self, x: int, y: int) -> Optional[Cell]:
         """获取指定位置的格子"""
         if 0 <= x < self.width and 0 <= y < self.height:
-            return self.grid[y][x]
+            code = self.terrain_codes[y, x]
+            if code != EMPTY_CODE:
+                return Cell(x, y, self.terrain_names[code])
         return None
         
     def to_array(self) -> np.ndarray:
-        """转换为numpy数组用于可视化"""
-        # 确保地形类型已初始化
-        TerrainType.initialize_from_config(phase=self.phase)
-        
-        # 创建地形映射
-        terrain_map = {}
-        terrain_types = TerrainType.get_all_types()
-        
-        for i, terrain_str in enumerate(terrain_types):
-            terrain_map[terrain_str] = i
-            
-        result = np.zeros((self.height, self.width), dtype=int)
-        for y in range(self.height):
-            for x in range(self.width):
-                cell = self.grid[y][x]
-                if cell:
-                    result[y, x] = terrain_map.get(cell.terrain_type, 0)
-                    
-        return result
+        """转换为numpy数组用于可视化（数值为TerrainType编码）"""
+        return np.take(self._type_code_lut, self.terrain_codes)
+        
+    def _get_type_codes(self) -> List[int]:
+        """获取每个内部编码对应的TerrainType编码（未知地形记为0）"""
+        type_codes = []
+        for terrain in self.terrain_names:
+            try:
+                type_codes.append(TerrainType.to_code(terrain))
+            except ValueError:
+                type_codes.append(0)
+        return type_codes
         
     def get_terrain_distribution(self) -> Dict[str, int]:
-        """获取地形分布统计"""
-        distribution = {}
-        total_cells = 0
-        
-        for y in range(self.height):
-            for x in range(self.width):
-                cell = self.grid[y][x]
-                if cell:
-                    terrain = cell.terrain_type
-                    distribution[terrain] = distribution.get(terrain, 0) + 1
-                    total_cells += 1
-                    
-        return distribution
+        """获取地形分布统计（只包含实际出现的地形）"""
+        codes = self.terrain_codes[self.terrain_codes != EMPTY_CODE]
+        counts = np.bincount(codes, minlength=len(self.terrain_names))
+        return {
+            terrain: int(count)
+            for terrain, count in zip(self.terrain_names, counts)
+            if count > 0
+        }
     
-    def _flood_fill_region(self, start_x: int, start_y: int, terrain_type: str, visited: Set[Tuple[int, int]]) -> int:
-        """使用flood fill算法计算连通区域大小"""
-        if (start_x, start_y) in visited:
-            return 0
-            
-        stack = [(start_x, start_y)]
-        region_size = 0
-        
-        while stack:
-            x, y = stack.pop()
-            
-            # 检查边界和访问状态
-            if (x < 0 or x >= self.width or y < 0 or y >= self.height or 
-                (x, y) in visited):
-                continue
-                
-            cell = self.grid[y][x]
-            if not cell or cell.terrain_type != terrain_type:
-                continue
-                
-            # 标记为已访问
-            visited.add((x, y))
-            region_size += 1
-            
-            # 添加4个邻居到栈中
-            stack.extend([(x+1, y), (x-1, y), (x, y+1), (x, y-1)])
+    def _label_regions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """标记4连通的同地形区域，返回按行扫描首次出现顺序排列的(区域地形编码, 区域大小)
+
+        先用numpy把每行切分成同地形的连续段，再用并查集合并上下相邻且地形相同的段，
+        Python层的工作量与段数和段间连接数成正比，而不是与格子数成正比。
+        """
+        codes = self.terrain_codes
+        height, width = codes.shape
+        flat = codes.ravel()
+        
+        # 行内连续段：每行开头或地形与左侧不同处开始新段
+        run_start_mask = np.ones(flat.shape, dtype=bool)
+        run_start_mask[1:] = flat[1:] != flat[:-1]
+        run_start_mask[::width] = True
+        run_starts = np.flatnonzero(run_start_mask)
+        run_codes = flat[run_starts]
+        run_lengths = np.diff(np.append(run_starts, flat.size))
+        run_ids = np.cumsum(run_start_mask).reshape(height, width) - 1
+        
+        # 上下相邻且地形相同的格子所在的段需要合并（去重后的段对）
+        vertical = (codes[:-1] == codes[1:]) & (codes[:-1] != EMPTY_CODE)
+        upper_runs = run_ids[:-1][vertical]
+        lower_runs = run_ids[1:][vertical]
+        links = np.unique(upper_runs * len(run_starts) + lower_runs)
+        
+        # 并查集：总是把编号较大的根挂到较小的根上，根即为区域内最先扫描到的段
+        parent = list(range(len(run_starts)))
+        
+        def find(run):
+            root = run
+            while parent[root] != root:
+                root = parent[root]
+            while parent[run] != root:  # 路径压缩
+                parent[run], run = root, parent[run]
+            return root
             
-        return region_size
+        for upper, lower in zip(*np.divmod(links, len(run_starts))):
+            root_upper, root_lower = find(int(upper)), find(int(lower))
+            if root_upper != root_lower:
+                if root_upper < root_lower:
+                    parent[root_lower] = root_upper
+                else:
+                    parent[root_upper] = root_lower
+                    
+        roots = np.array([find(run) for run in range(len(run_starts))], dtype=np.int64)
+        region_cells = np.bincount(roots, weights=run_lengths, minlength=len(run_starts))
+        
+        # 段编号按扫描顺序递增，区域的根段编号顺序即区域首次出现的顺序
+        region_roots = np.flatnonzero(
+            (roots == np.arange(len(run_starts))) & (run_codes != EMPTY_CODE)
+        )
+        return run_codes[region_roots], region_cells[region_roots].astype(np.int64)
     
     def analyze_regions(self) -> Dict[str, Dict[str, any]]:
         """分析地形区域，返回每种地形的区域数量和大小分布"""
-        visited = set()
         terrain_regions = {}
         
         # 初始化每种地形的统计
-        for terrain in self.terrain_types:
+        for terrain in self.terrain_names:
             terrain_regions[terrain] = {
                 'region_count': 0,
                 'region_sizes': [],
@@ -495,25 +795,14 @@ class CellBasedMap:
                 'average_region_size': 0
             }
         
-        # 遍历所有格子，找到未访问的区域
-        for y in range(self.height):
-            for x in range(self.width):
-                if (x, y) in visited:
-                    continue
-                    
-                cell = self.grid[y][x]
-                if not cell:
-                    continue
-                    
-                terrain_type = cell.terrain_type
-                region_size = self._flood_fill_region(x, y, terrain_type, visited)
-                
-                if region_size > 0:
-                    stats = terrain_regions[terrain_type]
-                    stats['region_count'] += 1
-                    stats['region_sizes'].append(region_size)
-                    stats['total_cells'] += region_size
-                    stats['largest_region'] = max(stats['largest_region'], region_size)
+        # 按区域首次出现的顺序统计
+        region_codes, region_sizes = self._label_regions()
+        for code, region_size in zip(region_codes.tolist(), region_sizes.tolist()):
+            stats = terrain_regions[self.terrain_names[code]]
+            stats['region_count'] += 1
+            stats['region_sizes'].append(region_size)
+            stats['total_cells'] += region_size
+            stats['largest_region'] = max(stats['largest_region'], region_size)
         
         # 计算平均区域大小
         for terrain, stats in terrain_regions.items():
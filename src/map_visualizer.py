@@ -2,9 +2,9 @@ import os
 import sys
 import json
 import matplotlib
-import matplotlib.pyplot as plt
 import matplotlib.patches as patches
-from matplotlib.widgets import Button, Slider
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import numpy as np
 from typing import Optional
 from cell_map_generator import CellBasedMap
@@ -53,6 +53,13 @@ def setup_matplotlib_backend():
 _gui_available = setup_matplotlib_backend()
 
 
+def _lazy_plt():
+    """按需导入pyplot，无GUI流程不必承担其导入开销"""
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
 class MapVisualizer:
     def __init__(
         self,
@@ -61,6 +68,7 @@ class MapVisualizer:
         headless: bool = False,
         output_dir: str = None,
         phase: int = None,
+        seed: int = 42,
     ):
         self.width = width
         self.height = height
@@ -68,11 +76,22 @@ class MapVisualizer:
         
         self.map_generator = CellBasedMap(width, height, phase=phase)
             
-        self.current_seed = 42
+        self.current_seed = seed
         self.headless = headless or not _gui_available
         self.output_dir = output_dir
+        # 地图图像句柄，首次绘制后通过set_data复用
+        self._map_image = None
+        # 地图上的地形图例，随地图图像一起作为动态对象绘制
+        self._legend = None
+        # 统计面板文本对象，首次绘制后通过set_text复用
+        self._stats_texts = None
+        # 整图重绘后缓存的静态背景，用于拖动种子滑块时局部刷新(blit)
+        self._background = None
+        # 地形颜色来自配置，运行期间不变，调色板只构建一次
+        self._color_palette = self._get_color_palette()
 
         if not self.headless:
+            plt = _lazy_plt()
             self.fig = plt.figure(figsize=(16, 8))
             # 创建网格布局：左侧地图，右侧统计信息
             gs = self.fig.add_gridspec(1, 2, width_ratios=[3, 1], hspace=0.3)
@@ -80,10 +99,14 @@ class MapVisualizer:
             self.stats_ax = self.fig.add_subplot(gs[0, 1])
             plt.subplots_adjust(bottom=0.25, right=0.95)
             self._setup_ui()
+            self.fig.canvas.mpl_connect("draw_event", self._on_draw)
 
         self._generate_and_display()
 
     def _setup_ui(self):
+        from matplotlib.widgets import Button, Slider
+
+        plt = _lazy_plt()
         ax_generate = plt.axes([0.1, 0.1, 0.15, 0.04])
         self.btn_generate = Button(ax_generate, "Generate New")
         self.btn_generate.on_clicked(self._on_generate_clicked)
@@ -93,14 +116,16 @@ class MapVisualizer:
             ax_seed, "Seed", 1, 1000, valinit=self.current_seed, valstep=1
         )
         self.slider_seed.on_changed(self._on_seed_changed)
+        # 滑块随种子变化，由_blit_dynamic_artists统一刷新，不触发整图重绘
+        self.slider_seed.drawon = False
+        ax_seed.set_animated(True)
 
         ax_export = plt.axes([0.75, 0.1, 0.15, 0.04])
         self.btn_export = Button(ax_export, "Export")
         self.btn_export.on_clicked(self._on_export_clicked)
 
     def _generate_and_display(self):
-        # 重新创建生成器并生成地图
-        self.map_generator = CellBasedMap(self.width, self.height, phase=self.phase)
+        # 复用__init__中创建的生成器：模板、兼容矩阵和颜色只加载一次，generate_map会原地清空网格
         self.map_generator.generate_map(seed=self.current_seed)
 
         if self.headless:
@@ -143,85 +168,129 @@ class MapVisualizer:
 
         return color_map
 
-    def _display_map(self):
-        self.ax.clear()
-        self.stats_ax.clear()
+    def _get_color_palette(self) -> np.ndarray:
+        """获取按地形编码索引的uint8调色板，用于一次性着色"""
+        color_map = self._get_color_mapping()
+        palette = np.zeros((len(color_map), 3), dtype=np.uint8)
+        for terrain_value, color in color_map.items():
+            palette[terrain_value] = np.round(np.asarray(color) * 255)
+        return palette
 
+    def _display_map(self):
         terrain_array = self.map_generator.to_array()
 
-        # 使用统一的颜色映射
-        color_map = self._get_color_mapping()
-
-        colored_map = np.zeros((terrain_array.shape[0], terrain_array.shape[1], 3))
-        for terrain_value, color in color_map.items():
-            mask = terrain_array == terrain_value
-            colored_map[mask] = color
+        # 使用统一的调色板，按地形编码一次性索引着色
+        colored_map = self._color_palette[terrain_array]
 
-        self.ax.imshow(colored_map, origin="upper", interpolation="nearest")
+        if self._map_image is not None:
+            # 地图尺寸不变，只替换图像数据，避免清空并重建坐标轴
+            self._map_image.set_data(colored_map)
+        else:
+            # 随种子变化的对象标记为animated，整图重绘时不画入背景
+            self._map_image = self.ax.imshow(
+                colored_map, origin="upper", interpolation="nearest", animated=True
+            )
+            self.ax.title.set_animated(True)
 
-        # 动态生成图例
-        from terrain_types import TerrainType
+            # 动态生成图例（调色板不随种子变化，只需创建一次）
+            from terrain_types import TerrainType
 
-        TerrainType.initialize_from_config()
-        terrain_types = TerrainType.get_all_types()
+            TerrainType.initialize_from_config()
+            terrain_types = TerrainType.get_all_types()
 
-        legend_elements = []
-        for i, terrain_str in enumerate(terrain_types):
-            if i in color_map:
+            legend_elements = []
+            for i, terrain_str in enumerate(terrain_types):
                 # 将地形类型字符串首字母大写作为显示标签
                 label = terrain_str.capitalize()
-                legend_elements.append(patches.Patch(color=color_map[i], label=label))
+                legend_elements.append(
+                    patches.Patch(color=self._color_palette[i] / 255, label=label)
+                )
 
-        self.ax.legend(
-            handles=legend_elements, loc="upper right", bbox_to_anchor=(1.02, 1)
-        )
+            # 图例位于坐标轴内、压在地图上方，同样标记为animated，在地图之后补画
+            self._legend = self.ax.legend(
+                handles=legend_elements, loc="upper right", bbox_to_anchor=(1.02, 1)
+            )
+            self._legend.set_animated(True)
+
+            self.ax.set_xlabel("X Coordinate")
+            self.ax.set_ylabel("Y Coordinate")
 
         self.ax.set_title(f"Generated Map (Seed: {self.current_seed})")
-        self.ax.set_xlabel("X Coordinate")
-        self.ax.set_ylabel("Y Coordinate")
 
         # 显示区域统计信息
         self._display_region_stats()
 
-        self.fig.canvas.draw()
+        self._blit_dynamic_artists()
+
+    def _get_dynamic_artists(self):
+        """获取随种子变化的绘图对象"""
+        # 按列表顺序绘制，图例必须在地图图像之后，才不会被地图覆盖
+        return [
+            self._map_image,
+            self._legend,
+            self.ax.title,
+            *self._stats_texts.values(),
+            self.slider_seed.ax,
+        ]
+
+    def _on_draw(self, event):
+        """整图重绘（首次显示、窗口缩放等）后重新缓存背景并补画动态对象"""
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self._get_dynamic_artists():
+            self.fig.draw_artist(artist)
+
+    def _blit_dynamic_artists(self):
+        """在缓存背景上只重画动态对象"""
+        canvas = self.fig.canvas
+        if self._background is None or not canvas.supports_blit:
+            canvas.draw_idle()
+            return
+
+        canvas.restore_region(self._background)
+        for artist in self._get_dynamic_artists():
+            self.fig.draw_artist(artist)
+        canvas.blit(self.fig.bbox)
+
+    def _create_region_stats_texts(self):
+        """创建统计面板的文本对象（只创建一次，之后仅更新内容）"""
+        self.stats_ax.axis('off')  # 隐藏坐标轴
+        transform = self.stats_ax.transAxes
+
+        self.stats_ax.text(0.05, 0.95, "Region Statistics", fontsize=14,
+                           fontweight='bold', transform=transform)
+        self._stats_texts = {
+            "summary": self.stats_ax.text(0.05, 0.89, "", fontsize=11, va='top',
+                                          linespacing=1.8, transform=transform,
+                                          animated=True),
+            "connectivity": self.stats_ax.text(0.05, 0.65, "", fontsize=10,
+                                               transform=transform, animated=True),
+            "details": self.stats_ax.text(0.05, 0.58, "", fontsize=10, va='top',
+                                          linespacing=1.5, transform=transform,
+                                          animated=True),
+        }
+
+        # 设置统计面板标题
+        self.stats_ax.set_title("Region Analysis", fontsize=12, pad=20)
 
     def _display_region_stats(self):
         """在右侧面板显示区域统计信息"""
-        self.stats_ax.clear()
-        self.stats_ax.axis('off')  # 隐藏坐标轴
-        
+        if self._stats_texts is None:
+            self._create_region_stats_texts()
+
         # 获取区域分析数据
         regions = self.map_generator.analyze_regions()
         total_regions = sum(stats['region_count'] for stats in regions.values())
         
-        # 获取地形描述
-        terrain_descriptions = self.map_generator._get_terrain_descriptions()
-        
         # 计算连贯性指标
         total_cells = sum(stats['total_cells'] for stats in regions.values())
         connectivity_score = (total_cells / total_regions) if total_regions > 0 else 0
         
-        # 构建显示文本
-        y_pos = 0.95
-        y_step = 0.05
-        
-        # 标题
-        self.stats_ax.text(0.05, y_pos, "Region Statistics", fontsize=14, fontweight='bold', 
-                          transform=self.stats_ax.transAxes)
-        y_pos -= y_step * 1.5
-        
         # 总体信息
-        self.stats_ax.text(0.05, y_pos, f"Total Regions: {total_regions}", fontsize=11,
-                          transform=self.stats_ax.transAxes)
-        y_pos -= y_step
-        
-        self.stats_ax.text(0.05, y_pos, f"Map Size: {self.width}×{self.height}", fontsize=11,
-                          transform=self.stats_ax.transAxes)
-        y_pos -= y_step
-        
-        self.stats_ax.text(0.05, y_pos, f"Coherence: {connectivity_score:.1f}", fontsize=11,
-                          transform=self.stats_ax.transAxes)
-        y_pos -= y_step * 1.5
+        self._stats_texts["summary"].set_text(
+            f"Total Regions: {total_regions}\n"
+            f"Map Size: {self.width}×{self.height}\n"
+            f"Coherence: {connectivity_score:.1f}"
+        )
         
         # 连贯性评价
         if connectivity_score >= 50:
@@ -234,62 +303,31 @@ class MapVisualizer:
             connectivity_text = "Poor"
             color = 'red'
             
-        self.stats_ax.text(0.05, y_pos, connectivity_text, fontsize=10, color=color,
-                          transform=self.stats_ax.transAxes)
-        y_pos -= y_step * 2
+        self._stats_texts["connectivity"].set_text(connectivity_text)
+        self._stats_texts["connectivity"].set_color(color)
         
-        # 各地形详细信息
+        # 各地形详细信息，合并为一个多行文本
+        lines = []
         for terrain, stats in regions.items():
             if stats['region_count'] > 0:
-                description = terrain_descriptions.get(terrain, terrain)
-                
-                # 地形名称
-                self.stats_ax.text(0.05, y_pos, f"{terrain.capitalize()}", 
-                                  fontsize=12, fontweight='bold',
-                                  transform=self.stats_ax.transAxes)
-                y_pos -= y_step
-                
-                # 区域数量
-                self.stats_ax.text(0.1, y_pos, f"Regions: {stats['region_count']}", 
-                                  fontsize=10, transform=self.stats_ax.transAxes)
-                y_pos -= y_step * 0.8
-                
-                # 总格子数和百分比
                 percentage = (stats['total_cells'] / total_cells) * 100
-                self.stats_ax.text(0.1, y_pos, f"Coverage: {percentage:.1f}% ({stats['total_cells']})", 
-                                  fontsize=10, transform=self.stats_ax.transAxes)
-                y_pos -= y_step * 0.8
-                
-                # 最大区域
-                self.stats_ax.text(0.1, y_pos, f"Largest: {stats['largest_region']} cells", 
-                                  fontsize=10, transform=self.stats_ax.transAxes)
-                y_pos -= y_step * 0.8
-                
-                # 平均大小
-                self.stats_ax.text(0.1, y_pos, f"Average: {stats['average_region_size']:.1f}", 
-                                  fontsize=10, transform=self.stats_ax.transAxes)
-                y_pos -= y_step * 0.8
+                lines.append(terrain.capitalize())
+                lines.append(f"  Regions: {stats['region_count']}")
+                lines.append(f"  Coverage: {percentage:.1f}% ({stats['total_cells']})")
+                lines.append(f"  Largest: {stats['largest_region']} cells")
+                lines.append(f"  Average: {stats['average_region_size']:.1f}")
                 
                 # 区域分布
                 sizes = stats['region_sizes']
-                if len(sizes) > 0:
-                    small = sum(1 for s in sizes if s < 20)
-                    medium = sum(1 for s in sizes if 20 <= s < 100)
-                    large = sum(1 for s in sizes if s >= 100)
-                    
-                    self.stats_ax.text(0.1, y_pos, f"S:{small} M:{medium} L:{large}", 
-                                      fontsize=9, color='gray',
-                                      transform=self.stats_ax.transAxes)
-                    y_pos -= y_step * 1.5
-                else:
-                    y_pos -= y_step
-                    
-        # 设置统计面板标题
-        self.stats_ax.set_title("Region Analysis", fontsize=12, pad=20)
-
+                small = sum(1 for s in sizes if s < 20)
+                medium = sum(1 for s in sizes if 20 <= s < 100)
+                large = sum(1 for s in sizes if s >= 100)
+                lines.append(f"  S:{small} M:{medium} L:{large}")
+                
+        self._stats_texts["details"].set_text("\n".join(lines))
 
     def _on_generate_clicked(self, event):
-        self.current_seed = np.random.randint(1, 1000)
+        self.current_seed = int(np.random.default_rng().integers(1, 1000))
         self.slider_seed.set_val(self.current_seed)
         self._generate_and_display()
 
@@ -326,61 +364,54 @@ class MapVisualizer:
             "height": self.height,
             "seed": self.current_seed,
             "generation_timestamp": timestamp,
-            "terrain_data": [],
+            # 地形数据为与npz相同的地形编码网格（-1为空），terrain_legend给出编码对应的地形名
+            "terrain_data": self.map_generator.terrain_codes.tolist(),
+            "terrain_legend": dict(enumerate(self.map_generator.terrain_names)),
             "generation_type": "cell_based"
         }
 
-        for y in range(self.height):
-            row = []
-            for x in range(self.width):
-                cell = self.map_generator.get_cell(x, y)
-                row.append(str(cell.terrain_type) if cell else "plain")
-            export_data["terrain_data"].append(row)
-
         # 文件名格式: timestamp_seed_XXXX
         filename = os.path.join(output_dir, f"{timestamp}_seed_{self.current_seed}.json")
         with open(filename, "w") as f:
-            json.dump(export_data, f, indent=2)
+            # 紧凑格式：整数网格不缩进，文件体积和写出时间都小得多
+            json.dump(export_data, f, separators=(",", ":"))
 
-        # 创建图像用于导出
-        if self.headless:
-            # 无GUI模式：创建新的figure而不是使用self.fig
-            fig, ax = plt.subplots(figsize=(10, 8))
-        else:
-            # GUI模式：使用plt.figure
-            plt.figure(figsize=(10, 8))
-            ax = plt.gca()
+        # 二进制地形编码数组，供程序快速加载（terrain_names为编码对应的地形名）
+        npz_filename = os.path.join(
+            output_dir, f"{timestamp}_seed_{self.current_seed}.npz"
+        )
+        np.savez_compressed(
+            npz_filename,
+            terrain_codes=self.map_generator.terrain_codes,
+            terrain_names=np.array(self.map_generator.terrain_names),
+            seed=self.current_seed,
+        )
 
-        terrain_array = self.map_generator.to_array()
+        # 使用独立的Agg画布渲染导出图像，不经过pyplot的figure管理，也不会弹出窗口
+        fig = Figure(figsize=(10, 8))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(111)
 
-        # 使用统一的颜色映射
-        color_map = self._get_color_mapping()
+        terrain_array = self.map_generator.to_array()
 
-        colored_map = np.zeros((terrain_array.shape[0], terrain_array.shape[1], 3))
-        for terrain_value, color in color_map.items():
-            mask = terrain_array == terrain_value
-            colored_map[mask] = color
+        # 使用统一的调色板，按地形编码一次性索引着色
+        colored_map = self._color_palette[terrain_array]
 
+        ax.imshow(colored_map, origin="upper", interpolation="nearest")
         if self.headless:
-            ax.imshow(colored_map, origin="upper", interpolation="nearest")
             ax.set_title(f"Generated Map (Seed: {self.current_seed}, {timestamp})")
-            ax.axis("off")
         else:
-            plt.imshow(colored_map, origin="upper", interpolation="nearest")
-            plt.title(f"Exported Map (Seed: {self.current_seed})")
-            plt.axis("off")
+            ax.set_title(f"Exported Map (Seed: {self.current_seed})")
+        ax.axis("off")
 
         # PNG文件名也使用相同的时间戳格式
         image_filename = os.path.join(output_dir, f"{timestamp}_seed_{self.current_seed}.png")
+        fig.savefig(image_filename, dpi=150, bbox_inches="tight")
 
-        if self.headless:
-            fig.savefig(image_filename, dpi=150, bbox_inches="tight")
-            plt.close(fig)
-        else:
-            plt.savefig(image_filename, dpi=150, bbox_inches="tight")
-            plt.close()
-
-        print(f"Map exported as {os.path.basename(filename)} and {os.path.basename(image_filename)}")
+        print(
+            f"Map exported as {os.path.basename(filename)}, "
+            f"{os.path.basename(npz_filename)} and {os.path.basename(image_filename)}"
+        )
 
     def show(self):
         if self.headless:
@@ -388,7 +419,7 @@ class MapVisualizer:
             self._export_map()
         else:
             try:
-                plt.show()
+                _lazy_plt().show()
             except Exception as e:
                 print(f"GUI显示失败: {e}")
                 print("切换到无GUI模式，生成地图并保存...")
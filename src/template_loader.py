@@ -7,6 +7,10 @@ from typing import List, Dict, Any
 from terrain_types import TerrainType
 
 
+# 已解析配置的缓存：(绝对路径, 修改时间, 文件大小) -> 配置字典，文件修改后自动失效
+_CONFIG_CACHE: Dict[tuple, Dict[str, Any]] = {}
+
+
 class TemplateLoader:
     def __init__(self, config_path: str = None, phase: int = None):
         if config_path is None:
@@ -27,10 +31,21 @@ class TemplateLoader:
         self.phase_config = self._load_phase_config()
 
     def _load_config(self) -> Dict[str, Any]:
-        """加载配置文件"""
+        """加载配置文件（按修改时间缓存解析结果，调用方不应修改返回的字典）"""
         try:
+            stat = os.stat(self.config_path)
+            cache_key = (
+                os.path.abspath(self.config_path),
+                stat.st_mtime_ns,
+                stat.st_size,
+            )
+            if cache_key in _CONFIG_CACHE:
+                return _CONFIG_CACHE[cache_key]
+            
             with open(self.config_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+                config = json.load(f)
+            _CONFIG_CACHE[cache_key] = config
+            return config
         except FileNotFoundError:
             raise FileNotFoundError(f"配置文件未找到: {self.config_path}")
         except json.JSONDecodeError as e:
@@ -80,21 +95,19 @@ class TemplateLoader:
         
         # 注意: region_templates 已废弃，不再需要合并
         
+        # 合并时复制嵌套容器，不修改（可能被缓存共享的）基础阶段配置
         # 合并 cell_types
-        if "cell_types" not in merged:
-            merged["cell_types"] = {}
+        merged["cell_types"] = dict(merged.get("cell_types", {}))
         if "additional_cell_types" in extension_config:
             merged["cell_types"].update(extension_config["additional_cell_types"])
         
         # 合并 edge_types
-        if "edge_types" not in merged:
-            merged["edge_types"] = {}
+        merged["edge_types"] = dict(merged.get("edge_types", {}))
         if "additional_edge_types" in extension_config:
             merged["edge_types"].update(extension_config["additional_edge_types"])
         
         # 合并 edge_compatibility
-        if "edge_compatibility" not in merged:
-            merged["edge_compatibility"] = []
+        merged["edge_compatibility"] = list(merged.get("edge_compatibility", []))
         if "additional_compatibility" in extension_config:
             merged["edge_compatibility"].extend(extension_config["additional_compatibility"])
         
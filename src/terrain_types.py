@@ -22,6 +22,9 @@ class TerrainType:
 
     _terrain_map = {}
     _reverse_map = {}
+    # 整数编码，与to_array输出的数值一致
+    _code_map = {}
+    _code_list = []
     _initialized = False
 
     @classmethod
@@ -52,6 +55,7 @@ class TerrainType:
                 cls._terrain_map[terrain_key] = terrain_key.upper()
                 cls._reverse_map[terrain_key.upper()] = terrain_key
 
+            cls._build_codes()
             cls._initialized = True
         except Exception as e:
             print(f"警告: 无法加载配置文件 {config_path}: {e}")
@@ -93,8 +97,17 @@ class TerrainType:
         for terrain_type in default_types:
             cls._terrain_map[terrain_type] = terrain_type.upper()
             cls._reverse_map[terrain_type.upper()] = terrain_type
+        cls._build_codes()
         cls._initialized = True
 
+    @classmethod
+    def _build_codes(cls):
+        """按地形类型顺序分配整数编码"""
+        cls._code_list = list(cls._terrain_map.keys())
+        cls._code_map = {
+            terrain: code for code, terrain in enumerate(cls._code_list)
+        }
+
     @classmethod
     def get_all_types(cls):
         """获取所有地形类型"""
@@ -120,6 +133,24 @@ class TerrainType:
             return cls._reverse_map[terrain_type]
         raise ValueError(f"未知的地形类型: {terrain_type}")
 
+    @classmethod
+    def to_code(cls, terrain_str: str) -> int:
+        """将地形字符串转换为整数编码"""
+        if not cls._initialized:
+            cls.initialize_from_config()
+        if terrain_str in cls._code_map:
+            return cls._code_map[terrain_str]
+        raise ValueError(f"未知的地形类型: {terrain_str}")
+
+    @classmethod
+    def from_code(cls, code: int) -> str:
+        """将整数编码转换为地形字符串"""
+        if not cls._initialized:
+            cls.initialize_from_config()
+        if 0 <= code < len(cls._code_list):
+            return cls._code_list[code]
+        raise ValueError(f"未知的地形编码: {code}")
+
 
 
 
@@ -128,6 +159,9 @@ class TerrainType:
 
 
 class Cell:
+    # 地图网格以编码存储，Cell只在查询时临时构造；属性固定，使用__slots__省去实例字典
+    __slots__ = ("x", "y", "terrain_type")
+
     # 类级别的颜色映射，将在运行时从配置文件加载
     _color_map = None
 
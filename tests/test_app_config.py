@@ -0,0 +1,193 @@
+"""
+应用配置测试
+测试配置文件加载、缓存和命令行参数处理
+"""
+
+import pytest
+import sys
+import os
+import json
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app_config import AppConfig
+
+
+def _write_config(path, enable_gui):
+    """写入测试用配置文件"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"ui": {"enable_gui": enable_gui}}, f)
+
+
+class TestConfigLoading:
+    """配置加载测试类"""
+
+    def test_default_config_loading(self):
+        """测试默认配置文件加载"""
+        config = AppConfig()
+        assert "ui" in config.config, "配置应该包含ui字段"
+
+    def test_missing_config_uses_default(self, tmp_path):
+        """测试配置文件缺失时使用默认配置"""
+        config = AppConfig(config_path=str(tmp_path / "missing.json"))
+        assert config.is_gui_enabled(), "默认配置应该启用GUI"
+
+    def test_parsed_config_is_cached(self, tmp_path):
+        """测试相同文件只解析一次"""
+        path = tmp_path / "config.json"
+        _write_config(path, False)
+
+        config1 = AppConfig(config_path=str(path))
+        config2 = AppConfig(config_path=str(path))
+        assert config1.config is config2.config, "未修改的配置文件应该复用解析结果"
+        assert not config2.is_gui_enabled()
+
+    def test_cache_invalidated_on_change(self, tmp_path):
+        """测试配置文件修改后重新解析"""
+        path = tmp_path / "config.json"
+        _write_config(path, False)
+        assert not AppConfig(config_path=str(path)).is_gui_enabled()
+
+        _write_config(path, True)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert AppConfig(config_path=str(path)).is_gui_enabled(), "修改后应该读取新配置"
+
+    def test_cache_invalidated_on_size_change(self, tmp_path):
+        """测试修改时间相同但文件大小变化时重新解析"""
+        path = tmp_path / "config.json"
+        _write_config(path, False)
+        stat = os.stat(path)
+        assert not AppConfig(config_path=str(path)).is_gui_enabled()
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"ui": {"enable_gui": True}, "extra": 1}, f)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert AppConfig(config_path=str(path)).is_gui_enabled(), "文件大小变化后应该读取新配置"
+
+    def test_large_config_loading(self, tmp_path):
+        """测试大配置文件（可能走内存映射路径）正确解析"""
+        path = tmp_path / "config.json"
+        padding = ["x" * 100] * 1000
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"ui": {"enable_gui": False}, "padding": padding}, f)
+
+        config = AppConfig(config_path=str(path))
+        assert not config.is_gui_enabled()
+        assert config.config["padding"] == padding
+
+
+class TestArgumentResolution:
+    """命令行参数解析结果测试类"""
+
+    def test_cli_overrides_config(self, tmp_path):
+        """测试命令行参数优先于配置文件"""
+        path = str(tmp_path / "config.json")
+        _write_config(path, True)
+        args = AppConfig.create_argument_parser().parse_args(
+            ["--headless", "--size", "16x12", "--phase", "2", "-o", "maps", "-q"]
+        )
+
+        config = AppConfig(config_path=path, args=args)
+        assert not config.is_gui_enabled(), "--headless应该禁用GUI"
+        assert config.get_default_map_size() == (16, 12)
+        assert config.get_phase() == 2
+        assert config.get_output_directory() == "maps"
+        assert not config.is_verbose_output()
+
+    def test_batch_seeds_are_stable(self):
+        """测试批量种子多次查询结果一致"""
+        args = AppConfig.create_argument_parser().parse_args(["--batch", "4"])
+        config = AppConfig(args=args)
+
+        seeds = config.get_headless_batch_seeds()
+        assert len(seeds) == 4
+        assert config.get_headless_batch_seeds() == seeds, "多次查询应该返回相同的种子"
+        assert len(set(seeds)) == len(seeds), "批量种子不应该重复"
+
+    def test_batch_larger_than_seed_range(self, monkeypatch, capsys):
+        """测试批量数量超过种子范围时退回有放回抽样并给出警告"""
+        import app_config
+
+        monkeypatch.setattr(app_config, "_SEED_RANGE", range(1, 4))
+        args = AppConfig.create_argument_parser().parse_args(["--batch", "5"])
+        seeds = AppConfig(args=args).get_headless_batch_seeds()
+
+        assert len(seeds) == 5, "应该生成指定数量的种子"
+        assert set(seeds) <= {1, 2, 3}, "种子应该在取值范围内"
+        assert "警告" in capsys.readouterr().out
+
+    def test_invalid_size_uses_default(self):
+        """测试无效尺寸格式使用默认尺寸"""
+        for size in ["16by12", "16x", "-4x3", "16x12x2"]:
+            args = AppConfig.create_argument_parser().parse_args([f"--size={size}"])
+            assert AppConfig(args=args).get_default_map_size() == (12, 10), size
+
+    def test_headless_skips_config_file(self, tmp_path):
+        """测试无GUI模式不读取配置文件"""
+        path = tmp_path / "config.json"
+        path.write_text("{invalid json", encoding="utf-8")
+        args = AppConfig.create_argument_parser().parse_args(["--headless"])
+
+        config = AppConfig(config_path=str(path), args=args)
+        assert config.config == {}, "无GUI模式不应该解析配置文件"
+        assert not config.is_gui_enabled()
+
+    def test_no_config_uses_defaults(self, tmp_path):
+        """测试--no-config忽略配置文件并使用默认设置"""
+        path = str(tmp_path / "config.json")
+        _write_config(path, False)
+        args = AppConfig.create_argument_parser().parse_args(["--no-config"])
+
+        config = AppConfig(config_path=path, args=args)
+        assert config.config == {}
+        assert config.is_gui_enabled(), "默认设置应该启用GUI"
+
+    def test_config_flag_selects_file(self, tmp_path):
+        """测试--config指定配置文件路径"""
+        path = str(tmp_path / "custom.json")
+        _write_config(path, False)
+        args = AppConfig.create_argument_parser().parse_args(["--config", path])
+
+        config = AppConfig(args=args)
+        assert config.config_path == path
+        assert not config.is_gui_enabled(), "应该读取--config指定的配置"
+
+    def test_argument_parser_is_cached(self):
+        """测试参数解析器只构建一次"""
+        assert AppConfig.create_argument_parser() is AppConfig.create_argument_parser()
+
+
+class TestSharedInstance:
+    """共享配置实例测试类"""
+
+    def test_get_instance_is_shared(self, tmp_path):
+        """测试相同配置路径返回同一实例"""
+        path = str(tmp_path / "config.json")
+        _write_config(path, False)
+
+        config = AppConfig.get_instance(config_path=path)
+        assert AppConfig.get_instance(config_path=path) is config, "相同路径应该复用实例"
+        assert not config.is_gui_enabled()
+
+    def test_get_instance_default_path(self):
+        """测试未指定路径与显式传入默认路径共享实例"""
+        config = AppConfig.get_instance()
+        assert AppConfig.get_instance(config_path=config.config_path) is config
+        assert config.config_path.endswith(os.path.join("config", "config.json"))
+
+    def test_get_instance_per_path(self, tmp_path):
+        """测试不同配置路径返回不同实例"""
+        path1 = str(tmp_path / "config1.json")
+        path2 = str(tmp_path / "config2.json")
+        _write_config(path1, False)
+        _write_config(path2, True)
+
+        assert AppConfig.get_instance(config_path=path1) is not AppConfig.get_instance(
+            config_path=path2
+        ), "不同路径应该是不同实例"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,285 @@
+"""
+逐格子地图生成器测试
+测试CellBasedMap的网格存储、生成结果和统计功能
+"""
+
+import pytest
+import sys
+import os
+import numpy as np
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cell_map_generator import CellBasedMap, EMPTY_CODE, NOISE_BIAS_PARAMS
+from terrain_types import Cell, TerrainType
+
+
+class TestGridStorage:
+    """网格存储测试类"""
+
+    def test_initial_grid_is_empty(self):
+        """测试初始网格全部为空"""
+        map_gen = CellBasedMap(16, 12)
+
+        assert map_gen.terrain_codes.shape == (12, 16), "网格形状应该是(高, 宽)"
+        assert map_gen.terrain_codes.dtype == np.int8, "网格应该使用int8编码"
+        assert (map_gen.terrain_codes == EMPTY_CODE).all(), "初始网格应该全部为空"
+        assert map_gen.get_cell(0, 0) is None, "空格子应该返回None"
+
+    def test_get_cell_after_generation(self):
+        """测试生成后按需构造的Cell对象"""
+        map_gen = CellBasedMap(16, 12)
+        map_gen.generate_map(seed=42)
+
+        cell = map_gen.get_cell(3, 5)
+        assert isinstance(cell, Cell), "get_cell应该返回Cell对象"
+        assert (cell.x, cell.y) == (3, 5), "Cell坐标应该与请求一致"
+        assert cell.terrain_type in map_gen.terrain_names, "Cell地形应该有效"
+        assert map_gen.get_cell(-1, 0) is None, "越界坐标应该返回None"
+        assert map_gen.get_cell(16, 0) is None, "越界坐标应该返回None"
+
+    def test_neighbor_index_matches_neighbors(self):
+        """测试预先计算的邻居下标与get_neighbors一致"""
+        map_gen = CellBasedMap(5, 4)
+        assert map_gen.neighbor_index.shape == (4, 5, 4)
+
+        for y in range(4):
+            for x in range(5):
+                indices = map_gen.neighbor_index[y, x]
+                expected = [ny * 5 + nx for nx, ny in map_gen.get_neighbors(x, y)]
+                assert indices[indices >= 0].tolist() == expected
+                assert (indices == -1).sum() == 4 - len(expected), "越界邻居应该为-1"
+
+
+class TestCompatibility:
+    """地形兼容性测试类"""
+
+    def test_compatibility_matrix_from_config(self):
+        """测试兼容矩阵与配置一致"""
+        map_gen = CellBasedMap(8, 8)
+        matrix = map_gen.compatibility_matrix
+
+        assert (matrix == matrix.T).all(), "兼容矩阵应该是对称的"
+        assert matrix.diagonal().all(), "同种地形应该总是兼容"
+        for terrain1, terrain2 in map_gen.template_loader.get_edge_compatibility():
+            assert map_gen.is_compatible(terrain1, terrain2)
+            assert map_gen.is_compatible(terrain2, terrain1)
+
+    def test_unknown_terrain_not_compatible(self):
+        """测试未知地形不兼容"""
+        map_gen = CellBasedMap(8, 8)
+        assert not map_gen.is_compatible("plain", "unknown_terrain")
+
+    def test_valid_masks_match_valid_terrains(self):
+        """测试候选地形位掩码与get_valid_terrains一致"""
+        map_gen = CellBasedMap(12, 10)
+        map_gen.generate_map(seed=11)
+        # 清空一部分格子，制造有邻居约束的空格
+        map_gen.terrain_codes[::2, ::3] = EMPTY_CODE
+
+        masks = map_gen._compute_valid_masks()
+        for y in range(10):
+            for x in range(12):
+                expected = map_gen.get_valid_terrains(x, y)
+                neighbor_codes = map_gen._get_neighbor_codes(x, y)
+                assert expected == [
+                    terrain for code, terrain in enumerate(map_gen.terrain_names)
+                    if map_gen.compatibility_matrix[code, neighbor_codes].all()
+                ], "候选地形应该与兼容矩阵一致"
+                actual = [
+                    terrain for code, terrain in enumerate(map_gen.terrain_names)
+                    if masks[y, x] >> code & 1
+                ]
+                assert actual == expected
+
+    def test_generation_rules_keyed_by_code(self, monkeypatch):
+        """测试生成规则中的必需邻居按地形编码检查"""
+        from template_loader import TemplateLoader
+
+        rules = {"highland": {"required_neighbors": {"must_have": ["plain"]}}}
+        monkeypatch.setattr(TemplateLoader, "get_generation_rules", lambda self: rules)
+        map_gen = CellBasedMap(3, 3)
+        plain = map_gen.terrain_code_map["plain"]
+        highland = map_gen.terrain_code_map["highland"]
+        assert map_gen._must_have_codes == {highland: [plain]}
+        assert map_gen._rule_bits == 1 << highland, "只有高地需要检查约束"
+
+        # 中心格子的邻居全是高地，无法再满足“必须有平原邻居”
+        map_gen.terrain_codes[:] = highland
+        map_gen.terrain_codes[1, 1] = EMPTY_CODE
+        assert not map_gen.validate_terrain_constraints("highland", 1, 1)
+        assert map_gen.validate_terrain_constraints("plain", 1, 1)
+
+        # 有一个邻居为空时，仍可能在之后放置平原
+        map_gen.terrain_codes[0, 1] = EMPTY_CODE
+        assert map_gen.validate_terrain_constraints("highland", 1, 1)
+
+
+class TestWeights:
+    """地形权重测试类"""
+
+    def test_neighbor_terrain_weight_boosted(self):
+        """测试邻居地形的权重被大幅提高"""
+        map_gen = CellBasedMap(8, 8)
+        plain = map_gen.terrain_code_map["plain"]
+        highland = map_gen.terrain_code_map["highland"]
+        map_gen.terrain_codes[3, 4] = highland
+        map_gen.terrain_codes[5, 4] = highland
+
+        assert map_gen.get_neighbor_terrains(4, 4) == {"highland": 2}
+        weights = map_gen.calculate_terrain_weights(4, 4)
+        assert weights.shape == (len(map_gen.terrain_names),), "权重应该按地形编码索引"
+        assert weights[highland] == pytest.approx(map_gen.terrain_weights["highland"] * 50.0 ** 2)
+        assert weights[plain] == pytest.approx(0.01), "非邻居地形只有很小的基础权重"
+
+    def test_noise_bias_field_range(self):
+        """测试噪声偏置场的形状和取值范围"""
+        map_gen = CellBasedMap(40, 30)
+        field = map_gen.noise_bias_field
+        assert field.shape == (30, 40, len(map_gen.terrain_names))
+
+        for code, terrain in enumerate(map_gen.terrain_names):
+            _, _, base, amplitude = NOISE_BIAS_PARAMS[terrain]
+            assert field[:, :, code].min() >= base
+            assert field[:, :, code].max() <= base + amplitude
+
+
+class TestGeneration:
+    """地图生成测试类"""
+
+    def test_all_cells_filled(self):
+        """测试生成后所有格子都被填充"""
+        map_gen = CellBasedMap(24, 16)
+        map_gen.generate_map(seed=123)
+
+        assert (map_gen.terrain_codes != EMPTY_CODE).all(), "所有格子都应该被填充"
+
+    def test_same_seed_same_map(self):
+        """测试相同种子生成相同地图"""
+        map_gen1 = CellBasedMap(24, 16)
+        map_gen2 = CellBasedMap(24, 16)
+        map_gen1.generate_map(seed=2024)
+        map_gen2.generate_map(seed=2024)
+
+        assert (map_gen1.terrain_codes == map_gen2.terrain_codes).all(), "相同种子应该生成相同的地图"
+
+    def test_reused_generator_matches_fresh(self):
+        """测试复用生成器重新生成与新建生成器的结果一致"""
+        reused = CellBasedMap(24, 16)
+        reused.generate_map(seed=8)
+        reused.generate_map(seed=31)
+        fresh = CellBasedMap(24, 16)
+        fresh.generate_map(seed=31)
+
+        assert (reused.terrain_codes == fresh.terrain_codes).all(), "上一次生成不应该影响下一次"
+
+    def test_generation_leaves_global_random_untouched(self):
+        """测试生成地图不改变全局随机状态"""
+        import random
+
+        random.seed(1)
+        expected = random.random()
+
+        random.seed(1)
+        CellBasedMap(16, 12).generate_map(seed=3)
+        assert random.random() == expected, "生成地图不应该消耗全局随机数"
+
+    def test_constraint_violations_repaired(self, monkeypatch):
+        """测试违反约束的格子被局部修复，生成结果满足所有约束"""
+        from template_loader import TemplateLoader
+
+        rules = {"highland": {"required_neighbors": {"must_have": ["plain"]}}}
+        monkeypatch.setattr(TemplateLoader, "get_generation_rules", lambda self: rules)
+        map_gen = CellBasedMap(30, 24)
+        map_gen.generate_map(seed=4)
+
+        assert (map_gen.terrain_codes != EMPTY_CODE).all(), "修复后所有格子都应该被填充"
+        assert map_gen._find_constraint_violations() == [], "修复后不应该有违反约束的格子"
+
+    def test_partial_compatibility_contradictions(self, monkeypatch):
+        """测试部分兼容配置下不兼容的相邻格子不超过行扫描填充的基准"""
+        from template_loader import TemplateLoader
+
+        weights = {
+            "plain": 3.0, "highland": 1.5, "forest": 1.5, "slope": 1.0, "cliff": 0.5,
+        }
+        compatibility = [
+            ["plain", "forest"], ["plain", "slope"], ["forest", "slope"],
+            ["slope", "highland"], ["highland", "cliff"], ["forest", "highland"],
+        ]
+        monkeypatch.setattr(TemplateLoader, "get_terrain_weights", lambda self: weights)
+        monkeypatch.setattr(
+            TemplateLoader, "get_edge_compatibility", lambda self: compatibility
+        )
+        map_gen = CellBasedMap(96, 80)
+        matrix = map_gen.compatibility_matrix
+
+        contradictions = 0
+        for seed in range(100, 110):
+            map_gen.generate_map(seed=seed)
+            codes = map_gen.terrain_codes
+            contradictions += int((~matrix[codes[1:], codes[:-1]]).sum())
+            contradictions += int((~matrix[codes[:, 1:], codes[:, :-1]]).sum())
+
+        # 行扫描填充在这组种子上的矛盾数；改动填充顺序或回退地形时不应使其增加
+        assert contradictions <= 276, f"不兼容的相邻格子增加到{contradictions}"
+
+    def test_distribution_matches_grid(self):
+        """测试地形分布统计与网格一致"""
+        map_gen = CellBasedMap(24, 16)
+        map_gen.generate_map(seed=7)
+
+        distribution = map_gen.get_terrain_distribution()
+        assert sum(distribution.values()) == 24 * 16, "分布总数应该等于格子数"
+        for terrain, count in distribution.items():
+            code = map_gen.terrain_code_map[terrain]
+            assert count == int((map_gen.terrain_codes == code).sum())
+
+    def test_to_array_shape(self):
+        """测试转换为数组"""
+        map_gen = CellBasedMap(24, 16)
+        map_gen.generate_map(seed=99)
+
+        array = map_gen.to_array()
+        assert array.shape == (16, 24), f"数组形状应该是(16,24)，实际是{array.shape}"
+
+    def test_to_array_uses_terrain_codes(self):
+        """测试数组数值与TerrainType编码一致"""
+        map_gen = CellBasedMap(24, 16)
+        map_gen.generate_map(seed=99)
+
+        array = map_gen.to_array()
+        for x, y in [(0, 0), (5, 7), (23, 15)]:
+            terrain = map_gen.get_cell(x, y).terrain_type
+            assert array[y, x] == TerrainType.to_code(terrain)
+            assert TerrainType.from_code(int(array[y, x])) == terrain
+
+    def test_region_analysis_covers_map(self):
+        """测试区域分析覆盖整个地图"""
+        map_gen = CellBasedMap(24, 16)
+        map_gen.generate_map(seed=5)
+
+        regions = map_gen.analyze_regions()
+        total_cells = sum(stats["total_cells"] for stats in regions.values())
+        assert total_cells == 24 * 16, "区域分析应该覆盖所有格子"
+
+    def test_region_analysis_connectivity(self):
+        """测试区域按4连通划分，按首次出现顺序统计大小"""
+        map_gen = CellBasedMap(5, 4)
+        plain = map_gen.terrain_code_map["plain"]
+        highland = map_gen.terrain_code_map["highland"]
+        map_gen.terrain_codes[:] = np.array([
+            [plain, plain, highland, plain, plain],
+            [highland, plain, highland, highland, plain],
+            [highland, plain, plain, plain, plain],
+            [plain, highland, highland, highland, plain],
+        ], dtype=np.int8)
+
+        regions = map_gen.analyze_regions()
+        assert regions["plain"]["region_sizes"] == [11, 1], "U形平原应该连成一个区域"
+        assert regions["highland"]["region_sizes"] == [3, 2, 3], "对角相邻不算连通"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,99 @@
+"""
+地图可视化器测试
+在Agg后端上测试MapVisualizer的绘制流程
+"""
+
+import pytest
+import sys
+import os
+import matplotlib
+import numpy as np
+
+# 测试只做离屏渲染，必须在导入可视化器之前设置后端
+matplotlib.use("Agg")
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import matplotlib.pyplot as plt
+from map_visualizer import MapVisualizer
+
+
+@pytest.fixture
+def gui_visualizer():
+    """创建非headless模式的可视化器（构造时即完成首次绘制）"""
+    visualizer = MapVisualizer(width=16, height=12, headless=False, seed=5)
+    yield visualizer
+    plt.close(visualizer.fig)
+
+
+class TestDisplay:
+    """地图绘制测试类"""
+
+    def test_first_display_creates_legend(self, gui_visualizer):
+        """测试首次绘制创建地图图像和使用调色板颜色的图例"""
+        assert not gui_visualizer.headless, "Agg后端下也应该走GUI绘制流程"
+        assert gui_visualizer._map_image is not None, "首次绘制应该创建地图图像"
+
+        legend = gui_visualizer.ax.get_legend()
+        assert legend is not None, "首次绘制应该创建图例"
+        names = gui_visualizer.map_generator.terrain_names
+        assert len(legend.get_patches()) == len(names)
+        for code, patch in enumerate(legend.get_patches()):
+            expected = tuple(gui_visualizer._color_palette[code] / 255)
+            assert patch.get_facecolor()[:3] == pytest.approx(expected)
+
+    def test_legend_drawn_above_map(self, gui_visualizer):
+        """测试整图重绘后图例画在地图图像之上，没有被地图覆盖"""
+        from matplotlib.transforms import Bbox
+
+        canvas = gui_visualizer.fig.canvas
+        canvas.draw()
+        renderer = canvas.get_renderer()
+        overlap = Bbox.intersection(
+            gui_visualizer._map_image.get_window_extent(renderer),
+            gui_visualizer.ax.get_legend().get_window_extent(renderer),
+        )
+        assert overlap is not None, "图例应该压在地图上"
+
+        # 图例背景接近白色，地形颜色都不是；被地图覆盖时重叠区域没有浅色像素
+        pixels = np.asarray(canvas.buffer_rgba())[:, :, :3]
+        top = pixels.shape[0] - int(overlap.y1)
+        bottom = pixels.shape[0] - int(overlap.y0)
+        region = pixels[top:bottom, int(overlap.x0):int(overlap.x1)]
+        assert (region > 200).all(axis=2).mean() > 0.5, "图例被地图图像覆盖"
+
+    def test_redisplay_reuses_image(self, gui_visualizer):
+        """测试切换种子后重新绘制复用同一个图像对象"""
+        image = gui_visualizer._map_image
+        gui_visualizer.current_seed = 9
+        gui_visualizer._generate_and_display()
+
+        assert gui_visualizer._map_image is image, "重新绘制应该只替换图像数据"
+        assert gui_visualizer.ax.get_title() == "Generated Map (Seed: 9)"
+
+
+class TestExport:
+    """地图导出测试类"""
+
+    def test_npz_round_trip(self, tmp_path):
+        """测试导出的npz文件可以还原地形编码网格和种子"""
+        visualizer = MapVisualizer(
+            width=16, height=12, headless=True, output_dir=str(tmp_path), seed=17
+        )
+        visualizer._export_map()
+
+        npz_files = list(tmp_path.glob("*_seed_17.npz"))
+        assert len(npz_files) == 1, "应该导出一个npz文件"
+        with np.load(npz_files[0]) as data:
+            terrain_codes = data["terrain_codes"]
+            assert terrain_codes.dtype == np.int8, "地形编码应该保持int8"
+            assert (terrain_codes == visualizer.map_generator.terrain_codes).all()
+            assert data["terrain_names"].tolist() == (
+                visualizer.map_generator.terrain_names
+            )
+            assert int(data["seed"]) == 17
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])